@@ -0,0 +1,239 @@
+"""League include/exclude lists and cleanup rules, loaded from ``rules/*.json``.
+
+Each sport page has one rules file. A file is parsed and compiled into Polars
+expressions once, then cached by modification time and content hash, so edits
+are picked up on the next rerun without restarting the server. A file that
+fails to load is rejected and the last good version of it stays in use.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from functools import reduce
+from typing import Optional
+
+import polars as pl
+
+logger = logging.getLogger("league_rules")
+
+RULES_DIR = os.environ.get(
+    "LEAGUE_RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+)
+
+# Sidebar page name -> rules file name
+RULE_FILES = {
+    "Ice Hockey": "ice_hockey.json",
+    "Soccer": "soccer.json",
+    "Rugby": "rugby.json",
+    "Basketball": "basketball.json",
+    "Aussie Rules": "aussie_rules.json",
+}
+
+STRIP_DIGITS_STAGES = ("cleanup", "final")
+
+# Every rules file must set all of these, and nothing else
+RULES_KEYS = (
+    "league_prefix",
+    "exclude_before",
+    "include",
+    "cleanup",
+    "strip_digits",
+    "exclude_after",
+    "drop_columns",
+)
+# Allowed keys of 'exclude_before'/'exclude_after' entries and 'cleanup' steps;
+# 'pattern' is required in both
+EXCLUSION_KEYS = ("pattern", "lowercase")
+CLEANUP_KEYS = ("pattern", "replacement", "n")
+
+
+class RulesError(ValueError):
+    """Raised when a rules file is missing fields or holds an invalid pattern."""
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """Ready-to-use expressions for one sport's league filtering and cleanup.
+
+    ``exclude_before`` and ``exclude_after`` are None when the sport has no
+    exclusions at that stage. ``cleanup`` rewrites the League column but does
+    not strip digits; ``strip_digits`` says whether that happens right after
+    cleanup or once all filtering and date formatting is done.
+    """
+
+    league_prefix: str
+    exclude_before: Optional[pl.Expr]
+    include: pl.Expr
+    cleanup: pl.Expr
+    strip_digits: str
+    exclude_after: Optional[pl.Expr]
+    drop_columns: tuple
+    digest: str
+
+
+def _check_keys(entry: dict, allowed: tuple, where: str) -> None:
+    # A misspelt key would otherwise be ignored and its setting silently lost
+    unknown = sorted(set(entry) - set(allowed))
+    if unknown:
+        raise RulesError(f"Unknown keys in {where}: {', '.join(unknown)}")
+
+
+def _exclusion(terms: list, field_name: str) -> Optional[pl.Expr]:
+    if not isinstance(terms, list):
+        raise RulesError(f"'{field_name}' must be a list")
+    matchers = []
+    for term in terms:
+        if not isinstance(term, dict) or not isinstance(term.get("pattern"), str):
+            raise RulesError(f"Every '{field_name}' entry needs a string 'pattern'")
+        _check_keys(term, EXCLUSION_KEYS, f"a '{field_name}' entry")
+        if not isinstance(term.get("lowercase", False), bool):
+            raise RulesError(f"'lowercase' in '{field_name}' must be true or false")
+        league = pl.col("League")
+        if term.get("lowercase", False):
+            league = league.str.to_lowercase()
+        matchers.append(league.str.contains(term["pattern"]))
+    if not matchers:
+        return None
+    return reduce(lambda left, right: left | right, matchers)
+
+
+def compile_rules(spec: dict, digest: str = "") -> CompiledRules:
+    """Compile a parsed rules file into Polars expressions.
+
+    Args:
+        spec: Contents of a rules file
+        digest: Hash of the file contents, kept for cache bookkeeping
+
+    Returns:
+        CompiledRules for the sport
+
+    Raises:
+        RulesError: If a field is missing, unknown or has the wrong type, or a
+            pattern is not a valid regular expression
+    """
+    if not isinstance(spec, dict):
+        raise RulesError("Rules file must hold a JSON object")
+    _check_keys(spec, RULES_KEYS, "rules file")
+    missing = [key for key in RULES_KEYS if key not in spec]
+    if missing:
+        raise RulesError(f"Missing keys in rules file: {', '.join(missing)}")
+    prefix = spec.get("league_prefix")
+    if not isinstance(prefix, str) or not prefix:
+        raise RulesError("'league_prefix' must be a non-empty string")
+
+    include = spec.get("include")
+    if not isinstance(include, list) or not include or not all(
+        isinstance(word, str) for word in include
+    ):
+        raise RulesError("'include' must be a non-empty list of strings")
+
+    cleanup = pl.col("League")
+    steps = spec["cleanup"]
+    if not isinstance(steps, list):
+        raise RulesError("'cleanup' must be a list")
+    for step in steps:
+        if isinstance(step, dict):
+            _check_keys(step, CLEANUP_KEYS, "a 'cleanup' step")
+        if (
+            not isinstance(step, dict)
+            or not isinstance(step.get("pattern"), str)
+            or not isinstance(step.get("replacement", ""), str)
+            or not isinstance(step.get("n", 1), int)
+        ):
+            raise RulesError(
+                "Every 'cleanup' step needs a string 'pattern', "
+                "an optional string 'replacement' and an optional integer 'n'"
+            )
+        cleanup = cleanup.str.replace(
+            step["pattern"], step.get("replacement", ""), n=step.get("n", 1)
+        )
+
+    strip_digits = spec["strip_digits"]
+    if strip_digits not in STRIP_DIGITS_STAGES:
+        raise RulesError(f"'strip_digits' must be one of {STRIP_DIGITS_STAGES}")
+
+    drop_columns = spec["drop_columns"]
+    if not isinstance(drop_columns, list) or not all(
+        isinstance(column, str) for column in drop_columns
+    ):
+        raise RulesError("'drop_columns' must be a list of strings")
+
+    rules = CompiledRules(
+        league_prefix=prefix,
+        exclude_before=_exclusion(spec["exclude_before"], "exclude_before"),
+        include=pl.col("League").str.contains("|".join(include)),
+        cleanup=cleanup.alias("League"),
+        strip_digits=strip_digits,
+        exclude_after=_exclusion(spec["exclude_after"], "exclude_after"),
+        drop_columns=tuple(drop_columns),
+        digest=digest,
+    )
+
+    # Run every expression once so bad regexes fail here instead of mid-upload
+    probe = pl.DataFrame({"League": [prefix]}, schema={"League": pl.Utf8})
+    checks = [rules.include, rules.cleanup]
+    checks += [e for e in (rules.exclude_before, rules.exclude_after) if e is not None]
+    try:
+        for expr in checks:
+            probe.select(expr)
+    except pl.exceptions.PolarsError as e:
+        raise RulesError(f"Invalid pattern: {e}") from e
+    return rules
+
+
+_lock = threading.Lock()
+# Rules file path -> (mtime_ns, digest, CompiledRules)
+_cache = {}
+# Rules file path -> mtime_ns of a version that was rejected
+_rejected = {}
+# Page name -> message of the last rejected load, cleared once a load succeeds
+_errors = {}
+
+
+def load_rules(page: str) -> CompiledRules:
+    """Return the compiled rules for ``page``, reloading the file if it changed.
+
+    Raises:
+        RulesError: If the file is invalid and no earlier version was loaded
+    """
+    path = os.path.join(RULES_DIR, RULE_FILES[page])
+    with _lock:
+        cached = _cache.get(path)
+        mtime_ns = None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if cached is not None and mtime_ns in (cached[0], _rejected.get(path)):
+                return cached[2]
+            with open(path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if cached is not None and cached[1] == digest:
+                _cache[path] = (mtime_ns, digest, cached[2])
+                _errors.pop(page, None)
+                return cached[2]
+            try:
+                spec = json.loads(raw)
+            except ValueError as e:
+                raise RulesError(f"Invalid JSON: {e}") from e
+            rules = compile_rules(spec, digest)
+        except (OSError, RulesError) as e:
+            message = f"{RULE_FILES[page]}: {e}"
+            if _errors.get(page) != message:
+                logger.error("Rejected league rules %s", message)
+            _errors[page] = message
+            if mtime_ns is not None:
+                _rejected[path] = mtime_ns
+            if cached is None:
+                raise RulesError(message) from e
+            return cached[2]
+        _cache[path] = (mtime_ns, digest, rules)
+        _errors.pop(page, None)
+        logger.info("Loaded league rules %s (%s)", RULE_FILES[page], digest[:12])
+        return rules
+
+
+def rules_error(page: str) -> Optional[str]:
+    """Return why the latest rules file for ``page`` was rejected, if it was."""
+    return _errors.get(page)
@@ -0,0 +1,279 @@
+"""Load test: many users uploading exports to the sport pages at once.
+
+Each simulated upload goes through ``upload_flow`` like a sport page does:
+the file is read once, processed, checked against the goals history (Ice
+Hockey) and written to an Excel download, and both are kept in the user's
+``SessionFrames``. Latency stops there, as the page is then shown; the
+history record and the sampled shadow check that follow still load the
+server. Users run as threads (one server process, as Streamlit serves
+sessions) or as processes (a baseline free of GIL contention). Each
+configuration runs in a fresh interpreter so its peak RSS is its own::
+
+    python load_test.py --users 1 4 8 16 --mode thread process --rows 5000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from match_history import MatchHistory
+from memory_manager import SESSION_MEMORY_BUDGET_MB, SPILL_DIR, SessionFrames
+from sport_pipelines import PIPELINES
+from upload_flow import finish_upload, process_upload
+
+# Fewer latency samples than this make p99 little more than the maximum
+P99_MIN_SAMPLES = 100
+
+COLUMNS = [
+    "Date", "KO", "Home", "Away", "1", "2", "3", "4",
+    "HT", "OT", "AP", "FT", "Comment", "Postponed", "Match Id",
+]
+
+# League header rows used by the synthetic exports, kept and dropped ones alike
+LEAGUES = {
+    "Ice Hockey": [
+        "Ice Hockey.Russia.KHL, Week 3",
+        "Ice Hockey.Sweden.SHL, Playoffs, Round 2",
+        "Ice Hockey.Finland.Liiga, Relegation/Promotion",
+        "Ice Hockey.Germany.DEL",
+    ],
+    "Soccer": [
+        "Soccer.England.Premier League, Week 12",
+        "Soccer.Italy.Serie A 2025",
+        "Soccer.Spain.LaLiga 2",
+        "Soccer.France.Ligue 1",
+    ],
+    "Rugby": [
+        "Rugby.Six Nations 2025",
+        "Rugby.The Rugby Championship, Week 2",
+        "Rugby.Super Rugby Americas",
+    ],
+    "Basketball": [
+        "Basketball.Italy.Serie A, Week 4",
+        "Basketball.Australia.NBL, Playoffs, Semi",
+        "Basketball.Italy.Serie A2",
+        "Basketball.China.CBA 2025",
+    ],
+    "Aussie Rules": [
+        "Aussie rules.Australia.AFL, Week 5",
+        "Aussie rules.Australia.AFL Preseason",
+    ],
+}
+
+
+def synthetic_export(page: str, rows: int, seed: int = 0) -> bytes:
+    """Build an .xlsx export for ``page`` laid out like the real ones.
+
+    A title row comes first, then the header row, then fixtures grouped
+    under league header rows.
+    """
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["Export"] + [None] * (len(COLUMNS) - 1))
+    ws.append(COLUMNS)
+    match_id = 1000
+    while rows > 0:
+        ws.append([rnd.choice(LEAGUES[page])] + [None] * (len(COLUMNS) - 1))
+        for _ in range(min(rows, rnd.randint(1, 8))):
+            match_id += 1
+            rows -= 1
+
+            def score():
+                return f"{rnd.randint(0, 5)}:{rnd.randint(0, 5)}"
+
+            overtime = score() if rnd.random() < 0.2 else None
+            shootout = score() if overtime and rnd.random() < 0.3 else None
+            ws.append(
+                [
+                    f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d} 25",
+                    f"{rnd.randint(10, 22)}:00",
+                    f"Home {match_id}",
+                    f"Away {match_id}",
+                    score(), score(), score(), score(), score(),
+                    overtime,
+                    shootout,
+                    score() if rnd.random() < 0.9 else None,
+                    None,
+                    "1" if rnd.random() < 0.05 else "0",
+                    str(match_id),
+                ]
+            )
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def simulate_upload(
+    page: str,
+    data: bytes,
+    key: str,
+    frames: SessionFrames,
+    history: MatchHistory,
+) -> float:
+    """Process one upload the way a sport page does and return its latency in seconds."""
+    start = time.perf_counter()
+    result = process_upload(
+        page,
+        f"{page}.xlsx",
+        data,
+        key=key,
+        frames=frames,
+        history=history,
+    )
+    latency = time.perf_counter() - start
+    finish_upload(result, history=history)
+    return latency
+
+
+def _user(
+    user: int, page: str, data: bytes, uploads: int, history_dir: str
+) -> list:
+    frames = SessionFrames(int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024), SPILL_DIR)
+    history = MatchHistory(history_dir)
+    try:
+        # Every upload is a new file for the session, as with a fresh file_id
+        return [
+            simulate_upload(page, data, f"{page}:{user}:{n}", frames, history)
+            for n in range(uploads)
+        ]
+    finally:
+        frames.close()
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(latencies: list, percent: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method="inclusive")[percent - 1]
+
+
+def run_configuration(
+    users: int, mode: str, rows: int, uploads: int, shadow_rate: float = 0.0
+) -> dict:
+    """Run ``users`` concurrent users, each uploading ``uploads`` times, and measure."""
+    pages = list(PIPELINES)
+    exports = {page: synthetic_export(page, rows, seed=i) for i, page in enumerate(pages)}
+    executor_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+    # Read by maybe_shadow, in worker processes too
+    os.environ["SHADOW_SAMPLE_RATE"] = str(shadow_rate)
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="load-test-history-") as history_dir:
+        with executor_class(max_workers=users) as executor:
+            futures = [
+                executor.submit(
+                    _user,
+                    i,
+                    pages[i % len(pages)],
+                    exports[pages[i % len(pages)]],
+                    uploads,
+                    # The history lock is per process, so worker processes get a store each
+                    history_dir if mode == "thread" else os.path.join(history_dir, str(i)),
+                )
+                for i in range(users)
+            ]
+            latencies = [latency for future in futures for latency in future.result()]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "mode": mode,
+        "rows": rows,
+        "shadow_rate": shadow_rate,
+        "uploads": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        # Largest single worker process; 0 in thread mode
+        "peak_worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent upload load test for the sport pages.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--mode", nargs="+", choices=["thread", "process"], default=["thread"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000], help="Fixtures per export")
+    parser.add_argument("--uploads", type=int, default=20, help="Uploads per user")
+    parser.add_argument(
+        "--shadow-rate",
+        type=float,
+        default=float(os.environ.get("SHADOW_SAMPLE_RATE", "0")),
+        help="Fraction of uploads shadowed, as SHADOW_SAMPLE_RATE on the server",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    # Internal: run a single configuration and print its result as JSON
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        result = run_configuration(
+            args.users[0],
+            args.mode[0],
+            args.rows[0],
+            args.uploads,
+            args.shadow_rate,
+        )
+        print(json.dumps(result))
+        return 0
+
+    results = []
+    header = (
+        f"{'users':>5} {'mode':>7} {'rows':>7} {'uploads/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'worker MB':>9}"
+    )
+    print(header)
+    for rows in args.rows:
+        for mode in args.mode:
+            for users in args.users:
+                completed = subprocess.run(
+                    [
+                        sys.executable, os.path.abspath(__file__), "--single",
+                        "--users", str(users), "--mode", mode, "--rows", str(rows),
+                        "--uploads", str(args.uploads),
+                        "--shadow-rate", str(args.shadow_rate),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print(
+                    f"{users:>5} {mode:>7} {rows:>7} {result['throughput']:>9.2f} "
+                    f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f} "
+                    f"{result['peak_rss_mb']:>8.0f} {result['peak_worker_rss_mb']:>9.0f}"
+                )
+                if result["uploads"] < P99_MIN_SAMPLES:
+                    print(
+                        f"warning: p99 of {result['uploads']} uploads is not meaningful, "
+                        f"raise --uploads to get at least {P99_MIN_SAMPLES}",
+                        file=sys.stderr,
+                    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
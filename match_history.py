@@ -0,0 +1,299 @@
+"""History of processed Ice Hockey rows, used to flag goals that changed between exports.
+
+Rows are kept in a Parquet store partitioned by ``Match Id`` range. Match Ids
+are sequential, so the matches of one export share a handful of partitions::
+
+    <directory>/range=000012/<uuid>.parquet    # Match Ids 1200000-1299999
+    <directory>/range=other/<uuid>.parquet     # non-numeric Match Ids
+    <directory>/exports/<uuid>.parquet         # when each export was first recorded
+
+Every row carries the id of the export it came from (a hash of the uploaded
+file). A run only compares against rows from other exports recorded before
+its own export was first recorded, so re-processing or re-uploading a file
+gives the same flags as the first time, and an older export uploaded again
+is never compared with newer ones. Rows are only recorded when Goals or
+Period changed. A run only opens the
+partitions its Match Ids fall into, and every partition is compacted down to
+one file holding the latest rows of the two most recent exports per match,
+sorted by ``Match Id`` in small row groups so the ``Match Id`` filter skips
+most of it, once it collects too many part files.
+
+Reads, writes and compactions of a store are serialised by a lock shared by
+every ``MatchHistory`` on the same directory within the server process.
+"""
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import polars as pl
+
+logger = logging.getLogger("match_history")
+
+HISTORY_DIR = os.environ.get(
+    "ICE_HOCKEY_HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "history", "ice_hockey"),
+)
+
+HISTORY_SCHEMA = {
+    "Match Id": pl.Utf8,
+    "Goals": pl.Int64,
+    "Period": pl.Int32,
+    "Export": pl.Utf8,
+    "Recorded": pl.Datetime("us", "UTC"),
+}
+
+EXPORTS_SCHEMA = {"Export": pl.Utf8, "Recorded": HISTORY_SCHEMA["Recorded"]}
+
+# Partition name for Match Ids that are not numbers
+OTHER_PARTITION = "other"
+
+_locks_guard = threading.Lock()
+# Absolute store directory -> lock shared by every MatchHistory on it
+_locks = {}
+
+
+def _directory_lock(directory: str) -> threading.RLock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(directory), threading.RLock())
+
+
+class MatchHistory:
+    """Partitioned Parquet store of the Goals and Period last exported per match.
+
+    Args:
+        directory: Root folder of the store, created on first write
+        partition_size: Match Ids per range partition; fixed for the life of a store
+        max_parts: Part files a partition may collect before it is compacted
+        row_group_size: Rows per row group in compacted files
+    """
+
+    def __init__(
+        self,
+        directory: str = HISTORY_DIR,
+        partition_size: int = 100_000,
+        max_parts: int = 16,
+        row_group_size: int = 4096,
+    ):
+        self.directory = directory
+        self.partition_size = partition_size
+        self.max_parts = max_parts
+        self.row_group_size = row_group_size
+        self._lock = _directory_lock(directory)
+
+    def _partition_dir(self, partition: str) -> str:
+        return os.path.join(self.directory, f"range={partition}")
+
+    def _parts(self, partition: str) -> list:
+        partition_dir = self._partition_dir(partition)
+        if not os.path.isdir(partition_dir):
+            return []
+        return [
+            os.path.join(partition_dir, name)
+            for name in sorted(os.listdir(partition_dir))
+            if name.endswith(".parquet")
+        ]
+
+    def _exports_dir(self) -> str:
+        return os.path.join(self.directory, "exports")
+
+    def _export_parts(self) -> list:
+        exports_dir = self._exports_dir()
+        if not os.path.isdir(exports_dir):
+            return []
+        return [
+            os.path.join(exports_dir, name)
+            for name in sorted(os.listdir(exports_dir))
+            if name.endswith(".parquet")
+        ]
+
+    def _partition(self) -> pl.Expr:
+        # Zero-padded range number, or OTHER_PARTITION when the id is not a number
+        return (
+            (pl.col("Match Id").cast(pl.Int64, strict=False) // self.partition_size)
+            .cast(pl.Utf8)
+            .str.zfill(6)
+            .fill_null(OTHER_PARTITION)
+            .alias("__partition")
+        )
+
+    def previous(
+        self, match_ids: pl.Series, exclude_export: Optional[str] = None
+    ) -> pl.DataFrame:
+        """Return the latest recorded row for each of ``match_ids`` that has history.
+
+        With ``exclude_export``, only rows of other exports recorded before
+        ``exclude_export`` was first recorded are considered, so an export is
+        only ever compared with the exports that came before it.
+        """
+        ids = match_ids.cast(pl.Utf8).drop_nulls().unique()
+        partitions = (
+            ids.to_frame("Match Id").select(self._partition().unique().sort()).to_series()
+        )
+        with self._lock:
+            files = [path for partition in partitions for path in self._parts(partition)]
+            if not files:
+                return pl.DataFrame(schema=HISTORY_SCHEMA)
+            rows = pl.scan_parquet(files).filter(pl.col("Match Id").is_in(ids.implode()))
+            if exclude_export is not None:
+                rows = rows.filter(pl.col("Export") != exclude_export)
+                cutoff = self.first_recorded(exclude_export)
+                if cutoff is not None:
+                    rows = rows.filter(pl.col("Recorded") < cutoff)
+            return rows.sort("Recorded").unique(subset="Match Id", keep="last").collect()
+
+    def first_recorded(self, export_id: str) -> Optional[datetime]:
+        """Return when ``export_id`` was first recorded, or None if it never was."""
+        with self._lock:
+            parts = self._export_parts()
+            if not parts:
+                return None
+            return (
+                pl.scan_parquet(parts)
+                .filter(pl.col("Export") == export_id)
+                .select(pl.col("Recorded").min())
+                .collect()
+                .item()
+            )
+
+    def fill_goals_issue(self, df: pl.DataFrame, export_id: str) -> pl.DataFrame:
+        """Fill ``Goals issue`` for matches whose Goals or Period differ from an earlier export.
+
+        Each match is compared with its latest row from the exports recorded
+        before ``export_id`` was first recorded (all of them, for an export
+        not recorded yet). Rows without such history, or whose Goals and
+        Period are unchanged, keep an empty ``Goals issue``. Row order is preserved.
+        """
+        history = self.previous(df["Match Id"], exclude_export=export_id).select(
+            pl.col("Match Id"),
+            pl.col("Goals").alias("__previous_goals"),
+            pl.col("Period").alias("__previous_period"),
+        )
+        joined = df.with_columns(pl.col("Match Id").cast(pl.Utf8)).join(
+            history, on="Match Id", how="left", maintain_order="left"
+        )
+        goals_changed = pl.col("__previous_goals").is_not_null() & pl.col(
+            "Goals"
+        ).ne_missing(pl.col("__previous_goals"))
+        period_changed = pl.col("__previous_period").is_not_null() & pl.col(
+            "Period"
+        ).ne_missing(pl.col("__previous_period"))
+        changes = pl.concat_list(
+            pl.when(goals_changed).then(
+                pl.format("Goals {} -> {}", "__previous_goals", "Goals")
+            ),
+            pl.when(period_changed).then(
+                pl.format("Period {} -> {}", "__previous_period", "Period")
+            ),
+        ).list.drop_nulls()
+        return joined.with_columns(
+            pl.when(goals_changed | period_changed)
+            .then(changes.list.join("; "))
+            .otherwise(None)
+            .alias("Goals issue")
+        ).select(df.columns)
+
+    def record(
+        self, df: pl.DataFrame, export_id: str, recorded: Optional[datetime] = None
+    ) -> int:
+        """Append the rows of ``df`` whose Goals or Period changed to the store.
+
+        A row is skipped when the latest recorded row of its match, from any
+        export, has the same Goals and Period, so processing an export again
+        records nothing. The time ``export_id`` is first recorded is kept
+        even when none of its rows changed.
+
+        Returns:
+            Number of rows recorded
+        """
+        recorded = recorded or datetime.now(timezone.utc)
+        rows = (
+            df.select(
+                pl.col("Match Id").cast(pl.Utf8),
+                pl.col("Goals").cast(pl.Int64),
+                pl.col("Period").cast(pl.Int32),
+                pl.lit(export_id).alias("Export"),
+                pl.lit(recorded).cast(HISTORY_SCHEMA["Recorded"]).alias("Recorded"),
+            )
+            .drop_nulls("Match Id")
+            .unique(subset="Match Id", keep="last", maintain_order=True)
+        )
+        with self._lock:
+            if self.first_recorded(export_id) is None:
+                self._register_export(export_id, recorded)
+            latest = self.previous(rows["Match Id"]).select(
+                "Match Id",
+                pl.col("Goals").alias("__previous_goals"),
+                pl.col("Period").alias("__previous_period"),
+            )
+            rows = (
+                rows.join(latest, on="Match Id", how="left", maintain_order="left")
+                # ne_missing is also true for matches without history
+                .filter(
+                    pl.col("Goals").ne_missing(pl.col("__previous_goals"))
+                    | pl.col("Period").ne_missing(pl.col("__previous_period"))
+                )
+                .select(list(HISTORY_SCHEMA))
+            )
+            if rows.is_empty():
+                return 0
+            rows = rows.with_columns(self._partition())
+            for (partition,), part in rows.partition_by("__partition", as_dict=True).items():
+                partition_dir = self._partition_dir(partition)
+                os.makedirs(partition_dir, exist_ok=True)
+                part.drop("__partition").sort("Match Id").write_parquet(
+                    os.path.join(partition_dir, f"{uuid.uuid4().hex}.parquet")
+                )
+                if len(self._parts(partition)) > self.max_parts:
+                    self.compact(partition)
+        return rows.height
+
+    def _register_export(self, export_id: str, recorded: datetime) -> None:
+        exports_dir = self._exports_dir()
+        os.makedirs(exports_dir, exist_ok=True)
+        pl.DataFrame(
+            {"Export": [export_id], "Recorded": [recorded]}, schema=EXPORTS_SCHEMA
+        ).write_parquet(os.path.join(exports_dir, f"{uuid.uuid4().hex}.parquet"))
+        parts = self._export_parts()
+        if len(parts) <= self.max_parts:
+            return
+        exports = (
+            pl.scan_parquet(parts)
+            .group_by("Export")
+            .agg(pl.col("Recorded").min())
+            .sort("Recorded")
+            .collect()
+        )
+        target = os.path.join(exports_dir, f"{uuid.uuid4().hex}.parquet")
+        exports.write_parquet(target + ".tmp")
+        os.replace(target + ".tmp", target)
+        for path in parts:
+            os.unlink(path)
+
+    def compact(self, partition: str) -> None:
+        """Rewrite ``partition`` as one file holding the latest rows of the two most recent exports per match.
+
+        Two are kept so a match can still be compared with another export
+        when its most recent export is processed again. An older export
+        uploaded again may find nothing before it left, and then shows no flags.
+        """
+        with self._lock:
+            parts = self._parts(partition)
+            if len(parts) < 2:
+                return
+            latest = (
+                pl.scan_parquet(parts)
+                .sort("Recorded", descending=True)
+                .unique(subset=["Match Id", "Export"], keep="first", maintain_order=True)
+                .filter(pl.int_range(pl.len()).over("Match Id") < 2)
+                .sort("Match Id")
+                .collect()
+            )
+            target = os.path.join(self._partition_dir(partition), f"{uuid.uuid4().hex}.parquet")
+            latest.write_parquet(target + ".tmp", row_group_size=self.row_group_size)
+            os.replace(target + ".tmp", target)
+            for path in parts:
+                os.unlink(path)
+        logger.info("Compacted history partition %s: %d rows", partition, latest.height)
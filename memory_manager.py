@@ -0,0 +1,187 @@
+"""Per-session memory budget for processed result frames and their Excel downloads.
+
+Each Streamlit session keeps its processed frames, and the bytes of their
+Excel downloads, in a ``SessionFrames`` store so reruns reuse them. When the
+entries held in memory exceed the budget, the least recently used ones are
+spilled to local disk: frames to uncompressed Arrow IPC files, downloads as
+is. A spilled frame is reopened memory-mapped when the page needs it again,
+so its pages are file-backed and can be evicted by the OS instead of
+counting against the container's memory; a spilled download is read back
+into memory and counts against the budget again. Spill files have their
+own budget; past it the least recently used spilled frames are dropped and
+recomputed if the page needs them again.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Optional, Union
+
+import polars as pl
+import pyarrow as pa
+
+logger = logging.getLogger("memory_manager")
+
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", "256"))
+SESSION_SPILL_BUDGET_MB = float(os.environ.get("SESSION_SPILL_BUDGET_MB", "1024"))
+SPILL_DIR = os.environ.get("SPILL_DIR") or None
+
+
+def _open_mapped(path: str) -> pl.DataFrame:
+    # pyarrow keeps the mapping; pl.read_ipc would copy the file into memory
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return pl.from_arrow(table, rechunk=False)
+
+
+def _size(value: Union[pl.DataFrame, bytes]) -> int:
+    if isinstance(value, bytes):
+        return len(value)
+    return value.estimated_size()
+
+
+class SessionFrames:
+    """LRU store of one session's result frames and download bytes with a memory budget.
+
+    Args:
+        budget_bytes: In-memory bytes allowed before frames are spilled
+        spill_dir: Parent folder for spill files; the system temp folder by default
+        spill_budget_bytes: Spill file bytes allowed before spilled frames are dropped
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        spill_dir: Optional[str] = None,
+        spill_budget_bytes: Optional[int] = None,
+    ):
+        self.budget_bytes = budget_bytes
+        if spill_budget_bytes is None:
+            spill_budget_bytes = int(SESSION_SPILL_BUDGET_MB * 1024 * 1024)
+        self.spill_budget_bytes = spill_budget_bytes
+        self._dir = tempfile.mkdtemp(prefix="sports-excel-viewer-", dir=spill_dir)
+        # The session state is dropped when the session ends; remove its files then
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+        self._lock = threading.Lock()
+        # key -> (frame or bytes, size in bytes, spill file path or None)
+        self._frames = OrderedDict()
+        self.spill_count = 0
+        self.reload_count = 0
+        self.eviction_count = 0
+
+    def put(self, key: str, value: Union[pl.DataFrame, bytes]) -> None:
+        """Store a frame or download ``value`` under ``key`` as the most recently used entry."""
+        with self._lock:
+            self._discard(key)
+            self._frames[key] = (value, _size(value), None)
+            self._enforce_budget()
+
+    def get(self, key: str) -> Optional[Union[pl.DataFrame, bytes]]:
+        """Return the entry stored under ``key``, reopening it if it was spilled."""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return None
+            self._frames.move_to_end(key)
+            value, size, path = entry
+            if value is None:
+                self.reload_count += 1
+                if path.endswith(".arrow"):
+                    value = _open_mapped(path)
+                    self._frames[key] = (value, size, path)
+                else:
+                    with open(path, "rb") as f:
+                        value = f.read()
+                    # Back in memory, so it counts against the budget again
+                    self._discard(key)
+                    self._frames[key] = (value, size, None)
+                    self._enforce_budget()
+            return value
+
+    def _discard(self, key: str) -> None:
+        entry = self._frames.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            try:
+                os.unlink(entry[2])
+            except OSError:
+                pass
+
+    def _spilled_bytes(self) -> int:
+        return sum(size for df, size, path in self._frames.values() if path is not None)
+
+    def _in_memory_bytes(self) -> int:
+        # Entries backed by a spill file are memory-mapped or on disk only and do not count
+        return sum(size for df, size, path in self._frames.values() if path is None)
+
+    def _enforce_budget(self) -> None:
+        in_memory = self._in_memory_bytes()
+        # Oldest first; the most recent entry is never spilled, it is about to be shown
+        for key in list(self._frames)[:-1]:
+            if in_memory <= self.budget_bytes:
+                break
+            value, size, path = self._frames[key]
+            if path is not None:
+                continue
+            try:
+                if isinstance(value, bytes):
+                    path = os.path.join(self._dir, f"{uuid.uuid4().hex}.bin")
+                    with open(path, "wb") as f:
+                        f.write(value)
+                else:
+                    path = os.path.join(self._dir, f"{uuid.uuid4().hex}.arrow")
+                    value.write_ipc(path, compression="uncompressed")
+            except OSError:
+                logger.exception("Could not spill %s", key)
+                break
+            # Drop the in-memory copy; it is reopened on the next get()
+            self._frames[key] = (None, size, path)
+            self.spill_count += 1
+            in_memory -= size
+
+        spilled = self._spilled_bytes()
+        for key in list(self._frames):
+            if spilled <= self.spill_budget_bytes:
+                break
+            df, size, path = self._frames[key]
+            if path is None:
+                continue
+            # Frames already handed out stay valid; the mapping outlives the unlink
+            self._discard(key)
+            self.eviction_count += 1
+            spilled -= size
+
+    def stats(self) -> dict:
+        """Sizes and counters for the diagnostics panel."""
+        with self._lock:
+            return {
+                "frames": len(self._frames),
+                "in_memory_bytes": self._in_memory_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "spilled_frames": sum(
+                    1 for df, size, path in self._frames.values() if path is not None
+                ),
+                "spilled_bytes": self._spilled_bytes(),
+                "spill_budget_bytes": self.spill_budget_bytes,
+                "spill_count": self.spill_count,
+                "reload_count": self.reload_count,
+                "eviction_count": self.eviction_count,
+            }
+
+    def close(self) -> None:
+        """Forget every frame and remove the spill files."""
+        with self._lock:
+            self._frames.clear()
+        self._finalizer()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this server process, when the platform exposes it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
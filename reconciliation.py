@@ -0,0 +1,164 @@
+"""Reconcile Program Review output against the fixture exports of the sport pages.
+
+Program Review rows carry Sport/Category/Tournament/Date, with dates written
+``%-m/%-d/%Y``; fixture exports carry League/Date with dates written
+``%m/%d/%Y`` (or real dates, once a download has been re-saved in Excel) and
+the sport implied by the page that produced them. Both sides are reduced to
+the same (sport, league, date) key and compared with hash joins.
+
+Competition stages are not part of the league key: "SHL Playoffs", "SHL -
+Round 3" and "SHL" all reduce to the same key, so a program matches fixtures
+of any stage of its league on its date.
+"""
+import os
+
+import polars as pl
+
+# Downloaded fixture file name prefix -> sport page that produced it
+EXPORT_PREFIXES = {
+    "Ice Hockey": "Ice Hockey",
+    "League Data": "Soccer",
+    "Rugby": "Rugby",
+    "Basketball": "Basketball",
+    "Aussie Rules": "Aussie Rules",
+}
+
+KEY_COLUMNS = ["Sport key", "League key", "Date key"]
+
+# Stage and round names dropped from league keys
+STAGE_WORDS = (
+    r"\b(?:regular season|play[- ]?offs?|play[- ]?outs?|play[- ]?in"
+    r"|(?:relegation|championship|qualifying|qualification) round|round"
+    r"|(?:group|pool) [a-z]\b|group stage|knockout stage|knockouts?"
+    r"|(?:semi|quarter)[- ]?finals?|finals?)\b"
+)
+
+
+def sport_of_export(file_name: str):
+    """Return the sport page a downloaded fixture export came from, or None."""
+    base = os.path.basename(file_name)
+    for prefix, sport in EXPORT_PREFIXES.items():
+        if base.startswith(f"{prefix} - "):
+            return sport
+    return None
+
+
+def normalize_league(expr: pl.Expr) -> pl.Expr:
+    """Reduce a league or tournament name to a comparable key.
+
+    Lower-cases, drops Program Review date markers such as ``/2.6./``, the word
+    "week", stage names in STAGE_WORDS ("playoffs", "round", "group a", ...),
+    digits and punctuation other than the dot between country and competition,
+    and collapses whitespace.
+    """
+    return (
+        expr.str.to_lowercase()
+        .str.replace_all(r"/\d+\.\d+\./", " ")
+        .str.replace_all(r"\bweek\b", " ")
+        .str.replace_all(STAGE_WORDS, " ")
+        .str.replace_all(r"\d+", " ")
+        .str.replace_all(r"[^a-z.]+", " ")
+        .str.replace_all(r"\s*\.\s*", ".")
+        .str.replace_all(r"\s+", " ")
+        .str.strip_chars(" .")
+    )
+
+
+def _normalize_sport(expr: pl.Expr) -> pl.Expr:
+    return expr.str.to_lowercase().str.replace_all(r"\s+", " ").str.strip_chars()
+
+
+def _date_key(expr: pl.Expr, dtype: pl.DataType) -> pl.Expr:
+    # Date cells re-saved by Excel arrive typed; text is %m/%d/%Y or ISO.
+    # Text that is not a valid date gives null and is reported by reconcile.
+    if dtype == pl.Date:
+        return expr
+    if isinstance(dtype, pl.Datetime):
+        return expr.dt.date()
+    text = expr.cast(pl.Utf8).str.strip_chars()
+    # %m/%d parses both zero-padded and unpadded months and days
+    return pl.coalesce(
+        text.str.strptime(pl.Date, "%m/%d/%Y", strict=False),
+        text.str.strptime(pl.Date, "%Y-%m-%d", strict=False),
+    )
+
+
+def normalize_programs(df: pl.DataFrame) -> pl.DataFrame:
+    """Add key columns to Program Review output (Sport, Category, Tournament, Date)."""
+    df = df.with_columns(
+        _date_key(pl.col("Date"), df.schema["Date"]).alias("Date key"),
+        pl.col(["Sport", "Category", "Tournament"]).cast(pl.Utf8),
+    ).with_columns(pl.col("Date").cast(pl.Utf8))
+    return df.with_columns(
+        _normalize_sport(pl.col("Sport")).alias("Sport key"),
+        normalize_league(
+            pl.concat_str(
+                [pl.col("Category").fill_null(""), pl.col("Tournament").fill_null("")],
+                separator=".",
+            )
+        ).alias("League key"),
+    )
+
+
+def normalize_fixtures(df: pl.DataFrame, sport: str) -> pl.DataFrame:
+    """Add key columns to a sport page export (Date, League, ...) for ``sport``."""
+    df = df.with_columns(
+        _date_key(pl.col("Date"), df.schema["Date"]).alias("Date key"),
+        pl.col("League").cast(pl.Utf8),
+    ).with_columns(pl.col("Date").cast(pl.Utf8))
+    return df.with_columns(
+        pl.lit(sport).alias("Sport"),
+        _normalize_sport(pl.lit(sport)).alias("Sport key"),
+        normalize_league(pl.col("League")).alias("League key"),
+    )
+
+
+def _unreadable_date() -> pl.Expr:
+    return pl.col("Date key").is_null() & (
+        pl.col("Date").str.strip_chars().fill_null("") != ""
+    )
+
+
+def reconcile(programs: pl.DataFrame, fixtures: pl.DataFrame):
+    """List programs without fixtures, fixtures without a program, and unreadable dates.
+
+    A dated program matches fixtures of the same sport and league on that
+    date; a program with an empty Date matches any fixture of its sport and
+    league. A program whose Date is filled in but is not a valid date (e.g.
+    ``2/31/2025``) matches nothing and is reported on its own, as is a
+    fixture with such a date unless a dated program matches it.
+
+    Args:
+        programs: Output of normalize_programs
+        fixtures: Output of normalize_fixtures, for one or several sports
+
+    Returns:
+        Tuple of (unmatched programs, unmatched fixtures, programs with an
+        unreadable date)
+    """
+    unreadable = programs.filter(_unreadable_date())
+    dated = programs.filter(pl.col("Date key").is_not_null())
+    undated = programs.filter(pl.col("Date key").is_null() & ~_unreadable_date())
+    league_keys = KEY_COLUMNS[:2]
+
+    fixture_days = fixtures.select(KEY_COLUMNS).unique()
+    fixture_leagues = fixtures.filter(~_unreadable_date()).select(league_keys).unique()
+    unmatched_programs = pl.concat(
+        [
+            dated.join(fixture_days, on=KEY_COLUMNS, how="anti"),
+            undated.join(fixture_leagues, on=league_keys, how="anti"),
+        ]
+    )
+
+    unmatched_fixtures = fixtures.join(
+        dated.select(KEY_COLUMNS).unique(), on=KEY_COLUMNS, how="anti"
+    )
+    unmatched_fixtures = pl.concat(
+        [
+            unmatched_fixtures.filter(~_unreadable_date()).join(
+                undated.select(league_keys).unique(), on=league_keys, how="anti"
+            ),
+            unmatched_fixtures.filter(_unreadable_date()),
+        ]
+    )
+    return unmatched_programs, unmatched_fixtures, unreadable
@@ -0,0 +1,279 @@
+"""Shadow mode: run a candidate pipeline next to the reference one and diff the outputs.
+
+The reference pipelines in ``sport_pipelines`` define what the sport pages
+produce, quirks included. A candidate (a faster engine, a rules rewrite, ...)
+is only safe to roll out once it yields the same rows and cells for the same
+input. Uploads are shadowed at ``SHADOW_SAMPLE_RATE``; whole corpora of
+exports can be checked offline with::
+
+    python shadow_mode.py path/to/exports --page "Ice Hockey"
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Optional
+
+import polars as pl
+
+from sport_pipelines import PIPELINES, read_export
+
+logger = logging.getLogger("shadow_mode")
+
+KEY_COLUMN = "Match Id"
+
+# Candidate implementations shadowed against PIPELINES, keyed by page name
+CANDIDATES = {
+    page: partial(pipeline, vectorized=True) for page, pipeline in PIPELINES.items()
+}
+
+
+@dataclass
+class ShadowReport:
+    """Outcome of running a reference and a candidate pipeline on one input."""
+
+    page: str
+    reference_seconds: float
+    candidate_seconds: float = 0.0
+    # Set when the input could not be read or the reference pipeline raised
+    reference_error: Optional[str] = None
+    candidate_error: Optional[str] = None
+    reference_rows: int = 0
+    candidate_rows: int = 0
+    missing_columns: list = field(default_factory=list)
+    extra_columns: list = field(default_factory=list)
+    dtype_mismatches: dict = field(default_factory=dict)
+    missing_keys: list = field(default_factory=list)
+    extra_keys: list = field(default_factory=list)
+    cell_mismatches: dict = field(default_factory=dict)
+    order_matches: bool = True
+    # "reference" and/or "candidate" when that output has no key column
+    unkeyed: list = field(default_factory=list)
+
+    @property
+    def equivalent(self) -> bool:
+        return (
+            self.reference_error is None
+            and self.candidate_error is None
+            and not self.missing_columns
+            and not self.extra_columns
+            and not self.dtype_mismatches
+            and not self.missing_keys
+            and not self.extra_keys
+            and not self.cell_mismatches
+            and self.order_matches
+            and not self.unkeyed
+        )
+
+    def summary(self) -> str:
+        timing = (
+            f"reference {self.reference_seconds:.3f}s, "
+            f"candidate {self.candidate_seconds:.3f}s"
+        )
+        if self.reference_error is not None:
+            return f"{self.page}: reference failed ({self.reference_error})"
+        if self.candidate_error is not None:
+            return f"{self.page}: candidate failed ({self.candidate_error}); {timing}"
+        if self.equivalent:
+            return f"{self.page}: {self.reference_rows} rows equivalent; {timing}"
+        problems = []
+        if self.unkeyed:
+            problems.append(
+                f"rows cannot be matched, {KEY_COLUMN} is missing from "
+                + " and ".join(self.unkeyed)
+            )
+        if self.missing_columns or self.extra_columns:
+            problems.append(
+                f"columns missing {self.missing_columns}, extra {self.extra_columns}"
+            )
+        if self.dtype_mismatches:
+            problems.append(f"dtypes differ {self.dtype_mismatches}")
+        if self.missing_keys or self.extra_keys:
+            problems.append(
+                f"{len(self.missing_keys)} rows missing, {len(self.extra_keys)} extra"
+            )
+        if self.cell_mismatches:
+            problems.append(
+                "cells differ in "
+                + ", ".join(
+                    f"{column} ({len(keys)} rows)"
+                    for column, keys in self.cell_mismatches.items()
+                )
+            )
+        if not self.order_matches:
+            problems.append("row order differs")
+        return f"{self.page}: " + "; ".join(problems) + f"; {timing}"
+
+
+def _with_occurrence(df: pl.DataFrame, key: str) -> pl.DataFrame:
+    # Number repeated keys so duplicated Match Ids are compared pairwise
+    return df.with_columns(
+        pl.int_range(pl.len()).over(key).alias("__occurrence")
+    )
+
+
+def diff_frames(
+    reference: pl.DataFrame,
+    candidate: pl.DataFrame,
+    report: ShadowReport,
+    key: str = KEY_COLUMN,
+) -> ShadowReport:
+    """Fill ``report`` with the row-by-row and column-by-column differences.
+
+    Rows are matched on ``key``, null keys included; every shared column is
+    compared cell by cell with nulls treated as equal to each other.
+    """
+    report.reference_rows = reference.height
+    report.candidate_rows = candidate.height
+    report.missing_columns = [c for c in reference.columns if c not in candidate.columns]
+    report.extra_columns = [c for c in candidate.columns if c not in reference.columns]
+    shared = [c for c in reference.columns if c in candidate.columns and c != key]
+    report.dtype_mismatches = {
+        c: (str(reference.schema[c]), str(candidate.schema[c]))
+        for c in shared
+        if reference.schema[c] != candidate.schema[c]
+    }
+    report.unkeyed = [
+        side
+        for side, frame in (("reference", reference), ("candidate", candidate))
+        if key not in frame.columns
+    ]
+    if report.unkeyed:
+        return report
+
+    ref = _with_occurrence(reference, key)
+    cand = _with_occurrence(candidate, key)
+    join_on = [key, "__occurrence"]
+    report.missing_keys = ref.join(cand, on=join_on, how="anti", nulls_equal=True)[
+        key
+    ].to_list()
+    report.extra_keys = cand.join(ref, on=join_on, how="anti", nulls_equal=True)[
+        key
+    ].to_list()
+
+    comparable = [c for c in shared if c not in report.dtype_mismatches]
+    joined = ref.select(join_on + comparable).join(
+        cand.select(join_on + comparable),
+        on=join_on,
+        how="inner",
+        suffix="__candidate",
+        nulls_equal=True,
+    )
+    for column in comparable:
+        differs = joined.filter(
+            pl.col(column).ne_missing(pl.col(f"{column}__candidate"))
+        )
+        if differs.height:
+            report.cell_mismatches[column] = differs[key].to_list()
+
+    if not report.missing_keys and not report.extra_keys:
+        report.order_matches = ref[key].equals(cand[key])
+    return report
+
+
+def run_shadow(
+    page: str,
+    df: pl.DataFrame,
+    reference: Optional[pl.DataFrame] = None,
+    reference_seconds: float = 0.0,
+    candidate: Optional[Callable[[pl.DataFrame], pl.DataFrame]] = None,
+) -> ShadowReport:
+    """Run the reference and candidate pipelines for ``page`` on ``df`` and diff them.
+
+    Args:
+        page: Sidebar page name, used to look up PIPELINES and CANDIDATES
+        df: Frame as read from the uploaded workbook
+        reference: Already computed reference output, to avoid processing twice
+        reference_seconds: Time it took to compute ``reference``
+        candidate: Candidate pipeline; defaults to the one in CANDIDATES
+
+    Returns:
+        ShadowReport with timings and all differences found
+    """
+    if reference is None:
+        start = time.perf_counter()
+        reference = PIPELINES[page](df)
+        reference_seconds = time.perf_counter() - start
+    report = ShadowReport(page=page, reference_seconds=reference_seconds)
+
+    candidate = candidate or CANDIDATES[page]
+    start = time.perf_counter()
+    try:
+        candidate_output = candidate(df)
+    except Exception as e:
+        report.candidate_seconds = time.perf_counter() - start
+        report.candidate_error = str(e)
+        return report
+    report.candidate_seconds = time.perf_counter() - start
+    return diff_frames(reference, candidate_output, report)
+
+
+def shadow_sample_rate() -> float:
+    try:
+        return float(os.environ.get("SHADOW_SAMPLE_RATE", "0"))
+    except ValueError:
+        return 0.0
+
+
+def maybe_shadow(
+    page: str, df: pl.DataFrame, reference: pl.DataFrame, reference_seconds: float
+) -> Optional[ShadowReport]:
+    """Shadow a processed upload for a sampled fraction of requests and log the result."""
+    if page not in CANDIDATES or random.random() >= shadow_sample_rate():
+        return None
+    try:
+        report = run_shadow(page, df, reference, reference_seconds)
+    except Exception:
+        logger.exception("Shadow run failed for %s", page)
+        return None
+    if report.equivalent:
+        logger.info(report.summary())
+    else:
+        logger.warning(report.summary())
+    return report
+
+
+def run_corpus(directory: str, page: str) -> list:
+    """Shadow every .xls/.xlsx export in ``directory`` for ``page``.
+
+    An export that cannot be read, or that the reference pipeline fails on,
+    gets a non-equivalent report and the run goes on with the next one.
+    """
+    reports = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith((".xls", ".xlsx")):
+            continue
+        try:
+            df = read_export(os.path.join(directory, name))
+            report = run_shadow(page, df)
+        except Exception as e:
+            report = ShadowReport(page=page, reference_seconds=0.0, reference_error=str(e))
+        print(f"{name}: {report.summary()}")
+        reports.append(report)
+    return reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Diff candidate pipelines against the reference on a corpus of exports."
+    )
+    parser.add_argument("directory", help="Folder of .xls/.xlsx fixture exports")
+    parser.add_argument("--page", required=True, choices=sorted(CANDIDATES))
+    args = parser.parse_args(argv)
+
+    reports = run_corpus(args.directory, args.page)
+    failed = [r for r in reports if not r.equivalent]
+    print(f"{len(reports) - len(failed)}/{len(reports)} exports equivalent")
+    if reports:
+        reference_total = sum(r.reference_seconds for r in reports)
+        candidate_total = sum(r.candidate_seconds for r in reports)
+        print(f"Total time: reference {reference_total:.3f}s, candidate {candidate_total:.3f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
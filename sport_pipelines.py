@@ -0,0 +1,258 @@
+import polars as pl
+import re
+import tempfile
+import os
+from typing import Optional
+import xlrd
+from openpyxl import Workbook
+from league_rules import CompiledRules, load_rules
+
+
+def xls_to_xlsx(data: bytes) -> str:
+    """Convert the bytes of an .xls workbook to a temporary .xlsx file.
+
+    Args:
+        data: Raw contents of the .xls file
+
+    Returns:
+        Path to the converted .xlsx file. The caller is responsible for removing it.
+    """
+    # Save uploaded file to temporary location
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xls") as tmp_file:
+        tmp_file.write(data)
+        tmp_xls_path = tmp_file.name
+
+    try:
+        # Read the .xls file using xlrd
+        book = xlrd.open_workbook(tmp_xls_path)
+        sheet = book.sheet_by_index(0)
+
+        # Create a new .xlsx file using openpyxl
+        wb = Workbook()
+        ws = wb.active
+        if ws is None:
+            ws = wb.create_sheet()
+
+        # Write data to the new .xlsx file
+        for row in range(sheet.nrows):
+            for col in range(sheet.ncols):
+                ws.cell(row=row + 1, column=col + 1, value=sheet.cell_value(row, col))
+
+        # Save to temporary .xlsx file
+        tmp_xlsx_path = tmp_xls_path.replace(".xls", ".xlsx")
+        wb.save(tmp_xlsx_path)
+    finally:
+        # Clean up the temporary .xls file
+        os.unlink(tmp_xls_path)
+
+    return tmp_xlsx_path
+
+
+def read_export(path: str) -> pl.DataFrame:
+    """Read a fixture export from disk, converting .xls files first."""
+    if path.endswith(".xls"):
+        with open(path, "rb") as f:
+            converted_file_path = xls_to_xlsx(f.read())
+        try:
+            return pl.read_excel(converted_file_path)
+        finally:
+            os.unlink(converted_file_path)
+    return pl.read_excel(path)
+
+
+FIXTURE_COLUMNS = ["Date", "KO", "League", "Home", "Away", "Match Id"]
+
+
+def _apply_header_row(df: pl.DataFrame) -> pl.DataFrame:
+    # The export's real header is the first data row; it stays in the frame
+    # and is dropped later by the league filter.
+    df = df.clone()
+    new_columns = df.head(1).row(0)
+    df.columns = new_columns
+    return df
+
+
+def _add_league(df: pl.DataFrame, prefix: str) -> pl.DataFrame:
+    return df.with_columns(
+        pl.when(df["Date"].str.starts_with(prefix))
+        .then(df["Date"])
+        .otherwise(None)
+        .alias("League")
+    ).with_columns(pl.col("League").forward_fill())
+
+
+def _strip_digits(expr: pl.Expr, vectorized: bool) -> pl.Expr:
+    if vectorized:
+        return expr.str.replace_all(r"\d+", "")
+    return expr.map_elements(
+        lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
+        return_dtype=pl.Utf8,
+    )
+
+
+def _sum_score(column: str, vectorized: bool) -> pl.Expr:
+    if vectorized:
+        return (
+            pl.col(column)
+            .str.split(":")
+            .list.eval(pl.element().cast(pl.Int64))
+            .list.sum()
+        )
+    return (
+        pl.col(column)
+        .str.split(":")
+        .map_elements(lambda x: sum(int(i) for i in x), return_dtype=pl.Int64)
+    )
+
+
+def _filter_leagues(
+    df: pl.DataFrame, rules: CompiledRules, vectorized: bool
+) -> pl.DataFrame:
+    # Header fix-up, league filtering and league name cleanup shared by all sports
+    df = _apply_header_row(df)
+    df = _add_league(df, rules.league_prefix)
+    if rules.exclude_before is not None:
+        df = df.filter(~rules.exclude_before)
+    df = df.filter(pl.col("Postponed") == "0")
+    df = df.filter(rules.include)
+    if rules.strip_digits == "cleanup":
+        df = df.with_columns(
+            _strip_digits(rules.cleanup.str.strip_chars(), vectorized).alias("League")
+        )
+    else:
+        df = df.with_columns(rules.cleanup)
+    if rules.exclude_after is not None:
+        df = df.filter(~rules.exclude_after)
+    return df
+
+
+def _finish_fixtures(df: pl.DataFrame, rules: CompiledRules) -> pl.DataFrame:
+    df = df.drop(list(rules.drop_columns))
+    df = _format_date(df)
+    if rules.strip_digits == "final":
+        # Remove numbers after all filtering is done
+        df = df.with_columns(
+            pl.col("League").str.replace_all(r"\d+", "").str.strip_chars().alias("League")
+        )
+    return df.select(FIXTURE_COLUMNS)
+
+
+def _format_date(df: pl.DataFrame) -> pl.DataFrame:
+    if "Date" in df.columns:
+        df = df.with_columns(
+            pl.col("Date")
+            .str.strptime(pl.Date, format="%d/%m %y")
+            .dt.strftime("%m/%d/%Y")
+            .alias("Date")
+        )
+    return df
+
+
+def process_ice_hockey(
+    df: pl.DataFrame, vectorized: bool = False, rules: Optional[CompiledRules] = None
+) -> pl.DataFrame:
+    """Turn a raw Ice Hockey export into the QA sheet shown on the Ice Hockey page.
+
+    Args:
+        df: Frame as read from the uploaded workbook
+        vectorized: Use native Polars expressions instead of Python callbacks
+        rules: League rules to apply; defaults to the current rules file
+
+    Returns:
+        Frame with the Ice Hockey display columns
+    """
+    rules = rules or load_rules("Ice Hockey")
+    df = _filter_leagues(df, rules, vectorized)
+
+    df = df.with_columns(
+        pl.when(pl.col("AP").is_not_null())
+        .then(_sum_score("AP", vectorized))
+        .when(pl.col("OT").is_not_null())
+        .then(_sum_score("OT", vectorized))
+        .when(pl.col("FT").is_not_null())
+        .then(_sum_score("FT", vectorized))
+        .otherwise(None)
+        .alias("Goals")
+    )
+
+    df = df.with_columns(
+        pl.when(pl.col("AP").is_not_null())
+        .then(5)
+        .when(pl.col("OT").is_not_null())
+        .then(4)
+        .otherwise(3)
+        .alias("Period")
+    )
+
+    df = df.drop(list(rules.drop_columns))
+    df = _format_date(df)
+    df = df.with_columns(
+        pl.lit(None).alias("Datapoints"),
+        pl.lit(None).alias("Issue"),
+        pl.lit(None).alias("Suspensions"),
+        pl.lit(None).alias("Suspension issue"),
+        pl.lit(None).alias("Goals issue"),
+    )
+
+    if "Goals" in df.columns:
+        df = df.filter(pl.col("Goals").is_not_null())
+    df = df.sort("Date") #sorts date by ascending order
+    return df.select(
+        [
+            "Date",
+            "KO",
+            "League",
+            "Home",
+            "Away",
+            "Match Id",
+            "Datapoints",
+            "Issue",
+            "Goals",
+            "Goals issue",
+            "Suspensions",
+            "Suspension issue",
+            "Period",
+        ]
+    )
+
+
+def process_soccer(
+    df: pl.DataFrame, vectorized: bool = False, rules: Optional[CompiledRules] = None
+) -> pl.DataFrame:
+    """Turn a raw Soccer export into the fixture list shown on the Soccer page."""
+    rules = rules or load_rules("Soccer")
+    return _finish_fixtures(_filter_leagues(df, rules, vectorized), rules)
+
+
+def process_rugby(
+    df: pl.DataFrame, vectorized: bool = False, rules: Optional[CompiledRules] = None
+) -> pl.DataFrame:
+    """Turn a raw Rugby export into the fixture list shown on the Rugby page."""
+    rules = rules or load_rules("Rugby")
+    return _finish_fixtures(_filter_leagues(df, rules, vectorized), rules)
+
+
+def process_basketball(
+    df: pl.DataFrame, vectorized: bool = False, rules: Optional[CompiledRules] = None
+) -> pl.DataFrame:
+    """Turn a raw Basketball export into the fixture list shown on the Basketball page."""
+    rules = rules or load_rules("Basketball")
+    return _finish_fixtures(_filter_leagues(df, rules, vectorized), rules)
+
+
+def process_aussie_rules(
+    df: pl.DataFrame, vectorized: bool = False, rules: Optional[CompiledRules] = None
+) -> pl.DataFrame:
+    """Turn a raw Aussie Rules export into the fixture list shown on the Aussie Rules page."""
+    rules = rules or load_rules("Aussie Rules")
+    return _finish_fixtures(_filter_leagues(df, rules, vectorized), rules)
+
+
+# Sidebar page name -> processing function
+PIPELINES = {
+    "Ice Hockey": process_ice_hockey,
+    "Soccer": process_soccer,
+    "Rugby": process_rugby,
+    "Basketball": process_basketball,
+    "Aussie Rules": process_aussie_rules,
+}
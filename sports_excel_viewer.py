@@ -1,59 +1,121 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import polars as pl
 import re
 from datetime import datetime
-import xlrd
-from openpyxl import Workbook
-import tempfile
 import os
+import time
+import logging
+from sport_pipelines import FIXTURE_COLUMNS, xls_to_xlsx
+from upload_flow import (
+    UploadError,
+    finish_upload,
+    process_upload,
+)
+from memory_manager import (
+    SESSION_MEMORY_BUDGET_MB,
+    SPILL_DIR,
+    SessionFrames,
+    process_rss_bytes,
+)
+from reconciliation import (
+    KEY_COLUMNS,
+    normalize_fixtures,
+    normalize_programs,
+    reconcile,
+    sport_of_export,
+)
+
+# Send the INFO reports of shadow mode, league rules and goals history to the server log
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s"
+)
 
 st.set_page_config(page_title="Sports Excel Viewer", page_icon="🏆", layout="wide")
 
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
     "Select",
-    ["Ice Hockey", "Soccer", "Rugby", "Basketball", "Aussie Rules", "Program Review"],
+    [
+        "Ice Hockey",
+        "Soccer",
+        "Rugby",
+        "Basketball",
+        "Aussie Rules",
+        "Program Review",
+        "Reconciliation",
+    ],
 )
 
 
 def convert_xls_to_xlsx(uploaded_file):
     """Convert .xls file to .xlsx format using xlrd and openpyxl"""
     try:
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xls") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_xls_path = tmp_file.name
-
-        # Read the .xls file using xlrd
-        book = xlrd.open_workbook(tmp_xls_path)
-        sheet = book.sheet_by_index(0)
-
-        # Create a new .xlsx file using openpyxl
-        wb = Workbook()
-        ws = wb.active
-        if ws is None:
-            ws = wb.create_sheet()
+        return xls_to_xlsx(uploaded_file.getvalue())
+    except Exception as e:
+        st.error(f"Error converting .xls file: {str(e)}")
+        return None
 
-        # Write data to the new .xlsx file
-        for row in range(sheet.nrows):
-            for col in range(sheet.ncols):
-                ws.cell(row=row + 1, column=col + 1, value=sheet.cell_value(row, col))
 
-        # Save to temporary .xlsx file
-        tmp_xlsx_path = tmp_xls_path.replace(".xls", ".xlsx")
-        wb.save(tmp_xlsx_path)
+def session_frames():
+    """Return this session's store of processed frames, creating it on first use."""
+    if "frames" not in st.session_state:
+        st.session_state["frames"] = SessionFrames(
+            int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024), SPILL_DIR
+        )
+    return st.session_state["frames"]
 
-        # Clean up the temporary .xls file
-        os.unlink(tmp_xls_path)
 
-        # Return the path to the converted file
-        return tmp_xlsx_path
+def process_sport_upload(page, uploaded_file):
+    """Process an upload for ``page``, reusing this session's earlier result.
 
-    except Exception as e:
-        st.error(f"Error converting .xls file: {str(e)}")
-        return None
+    Returns:
+        UploadResult, to be passed to finish_sport_upload once the page is rendered
+    """
+    try:
+        with st.spinner(f"Processing {uploaded_file.name}..."):
+            result = process_upload(
+                page,
+                uploaded_file.name,
+                uploaded_file.getvalue(),
+                key=f"{page}:{uploaded_file.file_id}",
+                frames=session_frames(),
+                on_convert=lambda: st.info("Converting .xls file to .xlsx format..."),
+            )
+    except UploadError as e:
+        st.error(str(e))
+        st.error("Failed to convert .xls file. Please try again.")
+        st.stop()
+    for warning in result.warnings:
+        st.warning(warning)
+    return result
+
+
+def finish_sport_upload(result):
+    """Record the upload in the goals history and run the sampled shadow check."""
+    for warning in finish_upload(result):
+        st.warning(warning)
+
+
+def show_diagnostics():
+    """Show this session's frame and download memory and spill counters in the sidebar."""
+    stats = session_frames().stats()
+    rss = process_rss_bytes()
+    with st.sidebar.expander("Diagnostics"):
+        st.json(
+            {
+                "Frames and downloads held": stats["frames"],
+                "In memory (MB)": round(stats["in_memory_bytes"] / 2**20, 1),
+                "Budget (MB)": round(stats["budget_bytes"] / 2**20, 1),
+                "Spilled entries": stats["spilled_frames"],
+                "Spilled (MB)": round(stats["spilled_bytes"] / 2**20, 1),
+                "Spill budget (MB)": round(stats["spill_budget_bytes"] / 2**20, 1),
+                "Spill count": stats["spill_count"],
+                "Reloads from disk": stats["reload_count"],
+                "Dropped from disk": stats["eviction_count"],
+                "Server RSS (MB)": round(rss / 2**20, 1) if rss is not None else None,
+            }
+        )
 
 
 def process_excel(uploaded_file):
@@ -73,165 +135,18 @@ if page == "Ice Hockey":
         "Upload Excel file for Ice Hockey", type=["xls", "xlsx"]
     )
     if uploaded_file is not None:
-        # Convert .xls to .xlsx if needed
-        if uploaded_file.name.endswith(".xls"):
-            st.info("Converting .xls file to .xlsx format...")
-            converted_file_path = convert_xls_to_xlsx(uploaded_file)
-            if converted_file_path is None:
-                st.error("Failed to convert .xls file. Please try again.")
-                st.stop()
-            # Read the converted file
-            df = pl.read_excel(converted_file_path)
-            # Clean up the temporary converted file
-            try:
-                os.unlink(converted_file_path)
-            except:
-                pass
-        else:
-            df = pl.read_excel(uploaded_file)
-        new_columns = df.head(1).row(0)
-        df = df.slice(0)
-        df.columns = new_columns
-        df = df.with_columns(
-            pl.when(df["Date"].str.starts_with("Ice Hockey"))
-            .then(df["Date"])
-            .otherwise(None)
-            .alias("League")
-        ).with_columns(pl.col("League").forward_fill())
-
-        # First filter out unwanted leagues (women's leagues and Liiga Relegation)
-        if "League" in df.columns:
-            df = df.filter(
-                ~(
-                    pl.col("League")
-                    .str.to_lowercase()
-                    .str.contains("liiga, relegation/promotion") | 
-                    pl.col("League")
-                    .str.to_lowercase()
-                    .str.contains("all star game")
-                )
-            )
-
-        df = df.filter(pl.col("Postponed") == "0")
-
-        # Then filter for wanted leagues
-        filter_words = [
-            "Russia.KHL",
-            "Czechia.Extraliga",
-            "Slovakia.Extraliga",
-            "Sweden.SHL",
-            "Finland.Liiga",
-            "Champions Hockey League",
-            "International.U20 World Championship, Group",
-            "International.World Championship, Group",
-            "International.World Championship, Knockout Stage",
-            "International.Olympic Games, Knockout Stage",
-            "International.Olympic Games, Group",
-            "International.Olympic Games, Women, Group",
-            "International.Olympic Games, Women, Knockout Stage",
-        ]
-        df = df.filter(pl.col("League").str.contains("|".join(filter_words)))
-
-        # Clean up league names
-        df = df.with_columns(
-            pl.col("League")
-            .str.replace(r",", "")
-            .str.replace(r"(?i)\bweek\b", "")
-            .str.replace("Ice Hockey.", "")
-            .str.replace("Playoff,", "")
-            .str.replace("Playoffs,", "")
-            .str.replace("Playout", "")
-            .str.replace("Knockout Stage,", "")
-            .str.strip_chars()
-            .map_elements(
-                lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
-                return_dtype=pl.Utf8,
-            )
-            .alias("League")
-        )
-
-        # Rest of your processing code remains the same...
-        df = df.with_columns(
-            pl.when(pl.col("AP").is_not_null())
-            .then(
-                pl.col("AP")
-                .str.split(":")
-                .map_elements(lambda x: sum(int(i) for i in x), return_dtype=pl.Int64)
-            )
-            .when(pl.col("OT").is_not_null())
-            .then(
-                pl.col("OT")
-                .str.split(":")
-                .map_elements(lambda x: sum(int(i) for i in x), return_dtype=pl.Int64)
-            )
-            .when(pl.col("FT").is_not_null())
-            .then(
-                pl.col("FT")
-                .str.split(":")
-                .map_elements(lambda x: sum(int(i) for i in x), return_dtype=pl.Int64)
-            )
-            .otherwise(None)
-            .alias("Goals")
-        )
-
-        df = df.with_columns(
-            pl.when(pl.col("AP").is_not_null())
-            .then(5)
-            .when(pl.col("OT").is_not_null())
-            .then(4)
-            .otherwise(3)
-            .alias("Period")
-        )
-
-        columns_to_drop = ["FT", "1", "2", "3", "OT", "AP", "Postponed"]
-        df = df.drop(columns_to_drop)
-        if "Date" in df.columns:
-            df = df.with_columns(
-                pl.col("Date")
-                .str.strptime(pl.Date, format="%d/%m %y")
-                .dt.strftime("%m/%d/%Y")
-                .alias("Date")
-            )
-        df = df.with_columns(
-            pl.lit(None).alias("Datapoints"),
-            pl.lit(None).alias("Issue"),
-            pl.lit(None).alias("Suspensions"),
-            pl.lit(None).alias("Suspension issue"),
-            pl.lit(None).alias("Goals issue"),
-        )
-
-        if "Goals" in df.columns:
-            df = df.filter(pl.col("Goals").is_not_null())
-        df = df.sort("Date") #sorts date by ascending order
-        df_display = df.select(
-            [
-                "Date",
-                "KO",
-                "League",
-                "Home",
-                "Away",
-                "Match Id",
-                "Datapoints",
-                "Issue",
-                "Goals",
-                "Goals issue",
-                "Suspensions",
-                "Suspension issue",
-                "Period",
-            ]
-        )
+        result = process_sport_upload("Ice Hockey", uploaded_file)
+        df_display = result.df_display
         st.subheader("Processed Ice Hockey Data")
         st.dataframe(df_display)
         current_date = datetime.now().strftime("%Y%m%d")
-        output = BytesIO()
-        df_display.write_excel(output)
-        output.seek(0)
         st.download_button(
             label="Download Excel",
-            data=output,
+            data=result.excel,
             file_name=f"Ice Hockey - {current_date}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
+        finish_sport_upload(result)
 
 elif page == "Soccer":
     st.title("⚽ Soccer Excel Upload")
@@ -240,91 +155,20 @@ elif page == "Soccer":
     )
     if uploaded_file is not None:
         try:
-            # Convert .xls to .xlsx if needed
-            if uploaded_file.name.endswith(".xls"):
-                st.info("Converting .xls file to .xlsx format...")
-                converted_file_path = convert_xls_to_xlsx(uploaded_file)
-                if converted_file_path is None:
-                    st.error("Failed to convert .xls file. Please try again.")
-                    st.stop()
-                # Read the converted file
-                df = pl.read_excel(converted_file_path)
-                # Clean up the temporary converted file
-                try:
-                    os.unlink(converted_file_path)
-                except:
-                    pass
-            else:
-                df = pl.read_excel(uploaded_file)
-            new_columns = df.head(1).row(0)
-            df = df.slice(0)
-            df.columns = new_columns
-            df = df.with_columns(
-                pl.when(df["Date"].str.starts_with("Soccer"))
-                .then(df["Date"])
-                .otherwise(None)
-                .alias("League")
-            ).with_columns(pl.col("League").forward_fill())
-            if "League" in df.columns:
-                df = df.filter(
-                    ~(
-                        pl.col("League").str.to_lowercase().str.contains("women")
-                        | pl.col("League")
-                        .str.to_lowercase()
-                        .str.contains("Spain.LaLiga 2")
-                        | pl.col("League").str.contains("MLS Next Pro")
-                    )
-                )
-            df = df.filter(pl.col("Postponed") == "0")
-            filter_words = [
-                "Italy.Serie A",
-                "Spain.LaLiga",
-                "England.Premier League",
-                "Germany.Bundesliga",
-                "USA.Major League Soccer",
-                "Austria.Bundesliga",
-                "USA.MLS",
-                "International Clubs.UEFA Champions League",
-            ]
-            df = df.filter(pl.col("League").str.contains("|".join(filter_words)))
-            df = df.with_columns(
-                pl.col("League")
-                .str.replace(r",", "")
-                .str.replace(r"(?i)\bweek\b", "")
-                .str.replace("Soccer.", "")
-                .str.strip_chars()
-                .map_elements(
-                    lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .alias("League")
-            )
-
-            columns_to_drop = ["AP", "OT", "HT", "FT", "Comment", "Postponed"]
-            df = df.drop(columns_to_drop)
-            if "Date" in df.columns:
-                df = df.with_columns(
-                    pl.col("Date")
-                    .str.strptime(pl.Date, format="%d/%m %y")
-                    .dt.strftime("%m/%d/%Y")
-                    .alias("Date")
-                )
+            result = process_sport_upload("Soccer", uploaded_file)
+            df_display = result.df_display
             st.subheader("Processed League Data")
-            df_display = df.select(["Date", "KO", "League", "Home", "Away", "Match Id"])
-
             st.dataframe(df_display)
             current_date = datetime.now().strftime("%Y%m%d")
 
             # Download button - use df_display instead of df
-            output = BytesIO()
-            df_display.write_excel(output)  # Write the displayed columns only
-            output.seek(0)
             st.download_button(
                 label="Download Excel",
-                data=output,
+                data=result.excel,
                 file_name=f"League Data - {current_date}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
+            finish_sport_upload(result)
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
 
@@ -336,91 +180,20 @@ elif page == "Rugby":
     )
     if uploaded_file is not None:
         try:
-            # Convert .xls to .xlsx if needed
-            if uploaded_file.name.endswith(".xls"):
-                st.info("Converting .xls file to .xlsx format...")
-                converted_file_path = convert_xls_to_xlsx(uploaded_file)
-                if converted_file_path is None:
-                    st.error("Failed to convert .xls file. Please try again.")
-                    st.stop()
-                # Read the converted file
-                df = pl.read_excel(converted_file_path)
-                # Clean up the temporary converted file
-                try:
-                    os.unlink(converted_file_path)
-                except:
-                    pass
-            else:
-                df = pl.read_excel(uploaded_file)
-            new_columns = df.head(1).row(0)
-            df = df.slice(0)
-            df.columns = new_columns
-            df = df.with_columns(
-                pl.when(df["Date"].str.starts_with("Rugby"))
-                .then(df["Date"])
-                .otherwise(None)
-                .alias("League")
-            ).with_columns(pl.col("League").forward_fill())
-            df = df.filter(pl.col("Postponed") == "0")
-            filter_words = [
-                "Six Nations",
-                "Super Rugby",
-                "Premiership Rugby",
-                "European Rugby Champions Cup",
-                "The Rugby Championship",
-            ]
-            df = df.filter(pl.col("League").str.contains("|".join(filter_words)))
-            df = df.with_columns(
-                pl.col("League")
-                .str.replace(r",", "")
-                .str.replace(r"(?i)\bweek\b", "")
-                .str.replace("Rugby.", "")
-                .str.strip_chars()
-                .map_elements(
-                    lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .alias("League")
-            )
-            # Filter out rows where League column contains "women" (case insensitive)
-            if "League" in df.columns:
-                if "League" in df.columns:
-                    df = df.filter(
-                        ~(
-                            pl.col("League").str.to_lowercase().str.contains("women")
-                            | pl.col("League").str.contains(
-                                "Premiership Rugby Cup Playoffs"
-                            )
-                            | pl.col("League").str.contains("U Six Nations")
-                            | pl.col("League").str.contains("Premiership Rugby Cup Pool")
-                            | pl.col("League").str.contains("Super Rugby Americas")
-                        )
-                    )
-            columns_to_drop = ["AP", "OT", "HT", "FT", "Comment", "Postponed"]
-            df = df.drop(columns_to_drop)
-            if "Date" in df.columns:
-                df = df.with_columns(
-                    pl.col("Date")
-                    .str.strptime(pl.Date, format="%d/%m %y")
-                    .dt.strftime("%m/%d/%Y")
-                    .alias("Date")
-                )
+            result = process_sport_upload("Rugby", uploaded_file)
+            df_display = result.df_display
             st.subheader("Processed Rugby Data")
-            df_display = df.select(["Date", "KO", "League", "Home", "Away", "Match Id"])
-
             st.dataframe(df_display)
             current_date = datetime.now().strftime("%Y%m%d")
 
             # Download button - use df_display instead of df
-            output = BytesIO()
-            df_display.write_excel(output)  # Write the displayed columns only
-            output.seek(0)
             st.download_button(
                 label="Download Excel",
-                data=output,
+                data=result.excel,
                 file_name=f"Rugby - {current_date}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
+            finish_sport_upload(result)
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
 
@@ -431,155 +204,20 @@ elif page == "Basketball":
     )
     if uploaded_file is not None:
         try:
-            # Convert .xls to .xlsx if needed
-            if uploaded_file.name.endswith(".xls"):
-                st.info("Converting .xls file to .xlsx format...")
-                converted_file_path = convert_xls_to_xlsx(uploaded_file)
-                if converted_file_path is None:
-                    st.error("Failed to convert .xls file. Please try again.")
-                    st.stop()
-                # Read the converted file
-                df = pl.read_excel(converted_file_path)
-                # Clean up the temporary converted file
-                try:
-                    os.unlink(converted_file_path)
-                except:
-                    pass
-            else:
-                df = pl.read_excel(uploaded_file)
-            new_columns = df.head(1).row(0)
-            df = df.slice(0)
-            df.columns = new_columns
-            df = df.with_columns(
-                pl.when(df["Date"].str.starts_with("Basketball"))
-                .then(df["Date"])
-                .otherwise(None)
-                .alias("League")
-            ).with_columns(pl.col("League").forward_fill())
-            df = df.filter(pl.col("Postponed") == "0")
-            filter_words = [
-                "Italy.Serie A",
-                "France.LNB Elite",
-                "Turkiye.Super Lig",
-                "Spain.Liga ACB",
-                "Germany.BBL",
-                "International.Euroleague",
-                "International.Eurocup",
-                "Israel.Super League",
-                "International.ABA Liga",
-                "China.CBA",
-                "Australia.NBL",
-                "Greece.Greek Basketball League",
-                "International.FIBA World Cup",
-                "International.Champions League",
-                "International.ABA Liga",
-                "International.Olympic",
-                "European Championship",
-            ]
-            df = df.filter(pl.col("League").str.contains("|".join(filter_words)))
-            df = df.with_columns(
-                pl.col("League")
-                .str.replace(r"Playoffs,", "Playoffs")
-                .str.replace(r"(?i)\bweek\b", "")
-                .str.replace("Basketball.", "")
-                .str.replace(r",", "", n=0)
-                .str.replace(r", ", "", n=0)
-                # .map_elements(
-                #     lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
-                #     return_dtype=pl.Utf8,
-                # )
-                .alias("League")
-            )
-            # Filter out rows where League column contains "women" (case insensitive)
-            if "League" in df.columns:
-                if "League" in df.columns:
-                    df = df.filter(
-                        ~(
-                            pl.col("League").str.to_lowercase().str.contains("women")
-                            | pl.col("League")
-                            .str.to_lowercase()
-                            .str.contains("Promotion")
-                            | pl.col("League").str.contains("NBL Central")
-                            | pl.col("League").str.contains("NBL East")
-                            | pl.col("League").str.contains("NBL West")
-                            | pl.col("League").str.contains("NBL North")
-                            | pl.col("League").str.contains("NBL South")
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group C"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group A"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group B"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group D"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group E"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group F"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Group G"
-                            )
-                            | pl.col("League").str.contains(
-                                "Champions League Asia Knockout Stage,"
-                            )
-                            | pl.col("League").str.contains(
-                                "ABA Liga Relegation/Promotion Playoff,"
-                            )
-                            | pl.col("League").str.contains(
-                                "FIBA World Cup Americas Pre-Qualifiers,"
-                            )
-                            | pl.col("League").str.contains("France.LNB Elite 2")
-                            | pl.col("League").str.contains("Germany.BBL Pokal")
-                            | pl.col("League").str.contains("International.ABA Liga 2")
-                            | pl.col("League").str.contains("FIBA World Cup African Qualifiers")
-                            | pl.col("League").str.contains("FIBA World Cup Americas")
-                            | pl.col("League").str.contains("FIBA World Cup Asian")
-                            | pl.col("League").str.contains("FIBA World Cup European")
-                            | pl.col("League").str.contains("Italy.Serie A2")
-
-                        )
-                    )
-            columns_to_drop = ["1", "2", "3", "4", "OT", "FT", "Comment", "Postponed"]
-            df = df.drop(columns_to_drop)
-            if "Date" in df.columns:
-                df = df.with_columns(
-                    pl.col("Date")
-                    .str.strptime(pl.Date, format="%d/%m %y")
-                    .dt.strftime("%m/%d/%Y")
-                    .alias("Date")
-                )
-            # REMOVE NUMBERS AFTER ALL FILTERING IS DONE
-            df = df.with_columns(
-                pl.col("League")
-                .str.replace_all(r"\d+", "")  # Remove all numbers
-                .str.strip_chars()  # Clean up any extra spaces left by number removal
-                .alias("League")
-            )
+            result = process_sport_upload("Basketball", uploaded_file)
+            df_display = result.df_display
             st.subheader("Processed Basketball Data")
-            df_display = df.select(["Date", "KO", "League", "Home", "Away", "Match Id"])
-
             st.dataframe(df_display)
             current_date = datetime.now().strftime("%Y%m%d")
 
             # Download button - use df_display instead of df
-            output = BytesIO()
-            df_display.write_excel(output)  # Write the displayed columns only
-            output.seek(0)
             st.download_button(
                 label="Download Excel",
-                data=output,
+                data=result.excel,
                 file_name=f"Basketball - {current_date}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
+            finish_sport_upload(result)
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
 
@@ -590,83 +228,20 @@ elif page == "Aussie Rules":
     )
     if uploaded_file is not None:
         try:
-            # Convert .xls to .xlsx if needed
-            if uploaded_file.name.endswith(".xls"):
-                st.info("Converting .xls file to .xlsx format...")
-                converted_file_path = convert_xls_to_xlsx(uploaded_file)
-                if converted_file_path is None:
-                    st.error("Failed to convert .xls file. Please try again.")
-                    st.stop()
-                # Read the converted file
-                df = pl.read_excel(converted_file_path)
-                # Clean up the temporary converted file
-                try:
-                    os.unlink(converted_file_path)
-                except:
-                    pass
-            else:
-                df = pl.read_excel(uploaded_file)
-            new_columns = df.head(1).row(0)
-            df = df.slice(0)
-            df.columns = new_columns
-            df = df.with_columns(
-                pl.when(df["Date"].str.starts_with("Aussie rules"))
-                .then(df["Date"])
-                .otherwise(None)
-                .alias("League")
-            ).with_columns(pl.col("League").forward_fill())
-            df = df.filter(pl.col("Postponed") == "0")
-            filter_words = ["Australia.AFL"]
-            df = df.filter(pl.col("League").str.contains("|".join(filter_words)))
-            df = df.with_columns(
-                pl.col("League")
-                .str.replace(r",", "")
-                .str.replace(r"(?i)\bweek\b", "")
-                .str.replace("Aussie rules.", "")
-                .str.strip_chars()
-                .map_elements(
-                    lambda x: re.sub(r"\d+", "", str(x)) if x is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .alias("League")
-            )
-            # Filter out rows where League column contains "women" (case insensitive)
-            if "League" in df.columns:
-                if "League" in df.columns:
-                    df = df.filter(
-                        ~(
-                            pl.col("League")
-                            .str.to_lowercase()
-                            .str.contains("Australia.SANFL")
-                            | pl.col("League").str.contains("AFL Preseason")
-                        )
-                    )
-            columns_to_drop = ["1", "2", "3", "4", "OT", "FT", "Comment", "Postponed"]
-            df = df.drop(columns_to_drop)
-            if "Date" in df.columns:
-                df = df.with_columns(
-                    pl.col("Date")
-                    .str.strptime(pl.Date, format="%d/%m %y")
-                    .dt.strftime("%m/%d/%Y")
-                    .alias("Date")
-                )
-            
+            result = process_sport_upload("Aussie Rules", uploaded_file)
+            df_display = result.df_display
             st.subheader("Processed League Data")
-            df_display = df.select(["Date", "KO", "League", "Home", "Away", "Match Id"])
-
             st.dataframe(df_display)
             current_date = datetime.now().strftime("%Y%m%d")
 
             # Download button - use df_display instead of df
-            output = BytesIO()
-            df_display.write_excel(output)  # Write the displayed columns only
-            output.seek(0)
             st.download_button(
                 label="Download Excel",
-                data=output,
+                data=result.excel,
                 file_name=f"Aussie Rules - {current_date}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
+            finish_sport_upload(result)
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
 
@@ -815,3 +390,95 @@ elif page == "Program Review":
             st.error(f"Error processing file: {str(e)}")
     else:
         st.info("Please upload a file to begin processing")
+
+
+elif page == "Reconciliation":
+    st.title("🔗 Program Review Reconciliation")
+    program_file = st.file_uploader(
+        "Upload Program Review CSV", type=["csv"]
+    )
+    fixture_files = st.file_uploader(
+        "Upload Excel exports from the sport pages",
+        type=["xlsx"],
+        accept_multiple_files=True,
+    )
+
+    if program_file is not None and fixture_files:
+        try:
+            start = time.perf_counter()
+            programs = normalize_programs(
+                pl.read_csv(program_file.getvalue(), infer_schema=False)
+            )
+            fixture_frames = []
+            for fixture_file in fixture_files:
+                sport = sport_of_export(fixture_file.name)
+                if sport is None:
+                    st.warning(
+                        f"Skipping '{fixture_file.name}': not named like a sport page download"
+                    )
+                    continue
+                df = pl.read_excel(fixture_file.getvalue())
+                fixture_frames.append(
+                    normalize_fixtures(
+                        # Date may arrive as real dates; normalize_fixtures parses it
+                        df.select(FIXTURE_COLUMNS).with_columns(
+                            pl.exclude("Date").cast(pl.Utf8)
+                        ),
+                        sport,
+                    )
+                )
+
+            if fixture_frames:
+                fixtures = pl.concat(fixture_frames)
+                unmatched_programs, unmatched_fixtures, unreadable = reconcile(
+                    programs, fixtures
+                )
+                elapsed = time.perf_counter() - start
+                st.success(
+                    f"Compared {programs.height} programs with {fixtures.height} fixtures "
+                    f"in {elapsed:.2f}s"
+                )
+                current_date = datetime.now().strftime("%Y%m%d")
+
+                st.subheader(f"Programs without fixtures ({unmatched_programs.height})")
+                df_programs = unmatched_programs.drop(KEY_COLUMNS)
+                st.dataframe(df_programs)
+                st.download_button(
+                    label="Download as CSV",
+                    data=df_programs.write_csv().encode("utf-8"),
+                    file_name=f"programs_without_fixtures_{current_date}.csv",
+                    mime="text/csv",
+                )
+
+                st.subheader(f"Fixtures without a program ({unmatched_fixtures.height})")
+                df_fixtures = unmatched_fixtures.select(["Sport"] + FIXTURE_COLUMNS)
+                st.dataframe(df_fixtures)
+                st.download_button(
+                    label="Download as CSV",
+                    data=df_fixtures.write_csv().encode("utf-8"),
+                    file_name=f"fixtures_without_program_{current_date}.csv",
+                    mime="text/csv",
+                    key="fixtures_without_program",
+                )
+
+                if unreadable.height:
+                    st.subheader(f"Programs with an unreadable date ({unreadable.height})")
+                    st.caption("These dates are not valid, so the programs were not matched.")
+                    df_unreadable = unreadable.drop(KEY_COLUMNS)
+                    st.dataframe(df_unreadable)
+                    st.download_button(
+                        label="Download as CSV",
+                        data=df_unreadable.write_csv().encode("utf-8"),
+                        file_name=f"programs_with_unreadable_dates_{current_date}.csv",
+                        mime="text/csv",
+                        key="programs_with_unreadable_dates",
+                    )
+            else:
+                st.warning("No sport page exports to compare against.")
+
+        except Exception as e:
+            st.error(f"Error processing file: {str(e)}")
+    else:
+        st.info("Upload the Program Review CSV and at least one sport page export to begin")
+
+show_diagnostics()
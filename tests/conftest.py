@@ -0,0 +1,30 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import league_rules  # noqa: E402
+
+
+@pytest.fixture
+def rules_dir(tmp_path, monkeypatch):
+    """A copy of the rules files in a temporary LEAGUE_RULES_DIR, with empty caches."""
+    directory = tmp_path / "rules"
+    shutil.copytree(league_rules.RULES_DIR, directory)
+    monkeypatch.setattr(league_rules, "RULES_DIR", str(directory))
+    monkeypatch.setattr(league_rules, "_cache", {})
+    monkeypatch.setattr(league_rules, "_rejected", {})
+    monkeypatch.setattr(league_rules, "_errors", {})
+    return directory
+
+
+def rewrite(path, text, step=1):
+    """Replace a file's contents and move its mtime ``step`` seconds forward."""
+    path.write_text(text)
+    # Make sure every rewrite gets a new mtime, however coarse the clock
+    mtime_ns = os.stat(path).st_mtime_ns + step * 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
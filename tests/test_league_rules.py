@@ -0,0 +1,80 @@
+import json
+import os
+
+import polars as pl
+import pytest
+
+from conftest import rewrite
+import league_rules
+from league_rules import RULE_FILES, RulesError, compile_rules, load_rules, rules_error
+from load_test import LEAGUES, synthetic_export
+from sport_pipelines import PIPELINES
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pipelines")
+
+
+def _spec(page="Soccer"):
+    with open(os.path.join(league_rules.RULES_DIR, RULE_FILES[page])) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("seed, page", list(enumerate(LEAGUES)))
+def test_rules_files_reproduce_hard_coded_output(seed, page, vectorized):
+    # Pinned from the pipelines as they were before the rules moved to JSON
+    pinned = RULE_FILES[page].replace(".json", ".parquet")
+    expected = pl.read_parquet(os.path.join(DATA_DIR, pinned))
+    df = pl.read_excel(synthetic_export(page, 300, seed=seed))
+
+    assert PIPELINES[page](df, vectorized=vectorized).equals(expected)
+
+
+@pytest.mark.parametrize(
+    "change, message",
+    [
+        (lambda spec: spec.update(exclude_afer=spec.pop("exclude_after")), "Unknown keys"),
+        (lambda spec: spec.pop("drop_columns"), "Missing keys"),
+        (lambda spec: spec["exclude_before"][0].update(lowercse=True), "Unknown keys"),
+        (lambda spec: spec["cleanup"][0].update(replacment=""), "Unknown keys"),
+        (lambda spec: spec["include"].append("("), "Invalid pattern"),
+        (lambda spec: spec.update(strip_digits="never"), "strip_digits"),
+    ],
+)
+def test_compile_rules_rejects_invalid_files(change, message):
+    spec = _spec()
+    change(spec)
+
+    with pytest.raises(RulesError, match=message):
+        compile_rules(spec)
+
+
+def test_load_rules_keeps_last_good_version(rules_dir):
+    path = rules_dir / RULE_FILES["Soccer"]
+    good = load_rules("Soccer")
+    assert load_rules("Soccer") is good
+    assert rules_error("Soccer") is None
+
+    bad_regex = _spec()
+    bad_regex["include"].append("(")
+    for step, text in enumerate(["{not json", json.dumps(bad_regex)], start=1):
+        rewrite(path, text, step)
+        assert load_rules("Soccer") is good
+        assert rules_error("Soccer")
+
+    spec = _spec()
+    spec["include"] = ["Italy.Serie A"]
+    rewrite(path, json.dumps(spec), 3)
+    edited = load_rules("Soccer")
+    assert edited is not good
+    assert rules_error("Soccer") is None
+
+    path.unlink()
+    assert load_rules("Soccer") is edited
+    assert rules_error("Soccer")
+
+
+def test_load_rules_raises_without_a_good_version(rules_dir):
+    (rules_dir / RULE_FILES["Soccer"]).write_text("{not json")
+
+    with pytest.raises(RulesError):
+        load_rules("Soccer")
@@ -0,0 +1,144 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import polars as pl
+
+from match_history import MatchHistory
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _sheet(goals, periods=None, ids=None):
+    ids = ids or [str(1000 + i) for i in range(len(goals))]
+    periods = periods or [3] * len(goals)
+    return pl.DataFrame(
+        {"Match Id": ids, "Goals": goals, "Period": periods, "Goals issue": [None] * len(goals)},
+        schema={"Match Id": pl.Utf8, "Goals": pl.Int64, "Period": pl.Int32, "Goals issue": pl.Utf8},
+    )
+
+
+def test_fill_goals_issue_flags_changes_from_other_exports(tmp_path):
+    history = MatchHistory(str(tmp_path))
+    history.record(_sheet([5, 2, 3]), "a", recorded=START)
+
+    filled = history.fill_goals_issue(
+        _sheet([6, 2, 5, 1], periods=[4, 3, 4, 3], ids=["1002", "1001", "1000", "9999"]),
+        "b",
+    )
+
+    assert filled["Match Id"].to_list() == ["1002", "1001", "1000", "9999"]
+    assert filled["Goals issue"].to_list() == [
+        "Goals 3 -> 6; Period 3 -> 4",
+        None,
+        "Period 3 -> 4",
+        None,
+    ]
+
+
+def test_fill_goals_issue_only_compares_with_earlier_exports(tmp_path):
+    history = MatchHistory(str(tmp_path))
+    history.record(_sheet([5]), "a", recorded=START)
+    history.record(_sheet([6]), "b", recorded=START + timedelta(hours=1))
+
+    # Re-processing export b still compares against a
+    assert history.fill_goals_issue(_sheet([6]), "b")["Goals issue"].to_list() == [
+        "Goals 5 -> 6"
+    ]
+    # a came first, so uploading it again is not compared with b
+    assert history.fill_goals_issue(_sheet([5]), "a")["Goals issue"].to_list() == [None]
+    # A new export is compared with the latest one
+    assert history.fill_goals_issue(_sheet([7]), "c")["Goals issue"].to_list() == [
+        "Goals 6 -> 7"
+    ]
+
+
+def test_exports_without_changed_rows_keep_their_place(tmp_path):
+    history = MatchHistory(str(tmp_path))
+    history.record(_sheet([5]), "a", recorded=START)
+    assert history.record(_sheet([5]), "b", recorded=START + timedelta(hours=1)) == 0
+    history.record(_sheet([6]), "c", recorded=START + timedelta(hours=2))
+
+    assert history.first_recorded("b") == START + timedelta(hours=1)
+    assert history.fill_goals_issue(_sheet([5]), "b")["Goals issue"].to_list() == [None]
+
+
+def test_record_skips_unchanged_rows(tmp_path):
+    history = MatchHistory(str(tmp_path))
+
+    assert history.record(_sheet([5, 2]), "a", recorded=START) == 2
+    assert history.record(_sheet([5, 2]), "a", recorded=START + timedelta(hours=1)) == 0
+    assert history.record(_sheet([5, 3]), "b", recorded=START + timedelta(hours=2)) == 1
+
+    latest = history.previous(pl.Series(["1000", "1001"])).sort("Match Id")
+    assert latest["Goals"].to_list() == [5, 3]
+    assert latest["Export"].to_list() == ["a", "b"]
+
+
+def test_record_partitions_by_match_id_range(tmp_path):
+    history = MatchHistory(str(tmp_path), partition_size=1000)
+    history.record(_sheet([1, 2, 3], ids=["1999", "2000", "abc"]), "a", recorded=START)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "exports",
+        "range=000001",
+        "range=000002",
+        "range=other",
+    ]
+
+
+def test_compact_keeps_latest_row_of_two_exports_per_match(tmp_path):
+    history = MatchHistory(str(tmp_path), max_parts=100)
+    for hour, (export_id, goals) in enumerate([("a", 1), ("b", 2), ("c", 3), ("c", 4)]):
+        history.record(_sheet([goals, 7]), export_id, recorded=START + timedelta(hours=hour))
+
+    history.compact("000000")
+
+    parts = os.listdir(tmp_path / "range=000000")
+    assert len(parts) == 1
+    stored = pl.read_parquet(tmp_path / "range=000000" / parts[0])
+    assert stored["Match Id"].is_sorted()
+    assert stored.filter(pl.col("Match Id") == "1000").select("Export", "Goals").rows() == [
+        ("c", 4),
+        ("b", 2),
+    ]
+    assert history.fill_goals_issue(_sheet([4, 7]), "c")["Goals issue"].to_list() == [
+        "Goals 2 -> 4",
+        None,
+    ]
+
+
+def test_compaction_is_shared_across_instances(tmp_path):
+    # Separate instances, as in separate sessions, on the same directory
+    errors = []
+
+    def session(worker):
+        history = MatchHistory(str(tmp_path), max_parts=2)
+        try:
+            for run in range(10):
+                recorded = START + timedelta(minutes=run, seconds=worker)
+                history.record(_sheet([run, worker]), f"{worker}-{run}", recorded=recorded)
+                history.fill_goals_issue(_sheet([run, worker]), f"{worker}-{run}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(os.listdir(tmp_path / "range=000000")) <= 3
+
+
+def test_export_registry_keeps_first_recorded_time_through_compaction(tmp_path):
+    history = MatchHistory(str(tmp_path), max_parts=2)
+    for hour in range(5):
+        history.record(_sheet([hour]), f"e{hour}", recorded=START + timedelta(hours=hour))
+    history.record(_sheet([9]), "e0", recorded=START + timedelta(hours=9))
+
+    assert len(os.listdir(tmp_path / "exports")) <= 3
+    assert [history.first_recorded(f"e{hour}") for hour in range(5)] == [
+        START + timedelta(hours=hour) for hour in range(5)
+    ]
@@ -0,0 +1,54 @@
+import os
+
+import polars as pl
+
+from memory_manager import SessionFrames
+
+
+def _frame(seed):
+    return pl.DataFrame({"Match Id": [seed * 1000 + i for i in range(1000)]})
+
+
+def test_spills_least_recently_used_frames_over_budget(tmp_path):
+    size = _frame(0).estimated_size()
+    frames = SessionFrames(int(size * 1.5), str(tmp_path))
+    for seed in range(3):
+        frames.put(str(seed), _frame(seed))
+
+    stats = frames.stats()
+    assert stats["spilled_frames"] == 2
+    assert frames.get("0").equals(_frame(0))
+    assert frames.reload_count == 1
+    frames.close()
+
+
+def test_drops_spilled_frames_over_spill_budget(tmp_path):
+    size = _frame(0).estimated_size()
+    frames = SessionFrames(0, str(tmp_path), spill_budget_bytes=int(size * 2.5))
+    for seed in range(5):
+        frames.put(str(seed), _frame(seed))
+
+    # Frames 0-3 were spilled; only the two most recent of them fit on disk
+    assert frames.get("0") is None
+    assert frames.get("1") is None
+    assert frames.get("3").equals(_frame(3))
+    assert frames.eviction_count == 2
+    spill_dir = os.path.join(tmp_path, os.listdir(tmp_path)[0])
+    assert len(os.listdir(spill_dir)) == 2
+    frames.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_spilled_downloads_are_read_back_into_memory(tmp_path):
+    download = b"x" * 1000
+    frames = SessionFrames(1500, str(tmp_path))
+    frames.put("excel", download)
+    frames.put("other", b"y" * 1000)
+
+    assert frames.stats()["spilled_bytes"] == 1000
+    assert frames.get("excel") == download
+    # Back in memory, so the other download is spilled in its place
+    stats = frames.stats()
+    assert stats["in_memory_bytes"] == 1000 and stats["spilled_bytes"] == 1000
+    assert frames.get("other") == b"y" * 1000
+    frames.close()
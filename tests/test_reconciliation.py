@@ -0,0 +1,79 @@
+from datetime import date
+
+import polars as pl
+
+from reconciliation import normalize_fixtures, normalize_programs, reconcile
+
+
+def _programs(rows):
+    return normalize_programs(
+        pl.DataFrame(
+            rows,
+            schema=["Sport", "Category", "Tournament", "Date"],
+            orient="row",
+        )
+    )
+
+
+def _fixtures(rows, sport="Ice Hockey", date_dtype=pl.Utf8):
+    df = pl.DataFrame(
+        rows,
+        schema={"Date": date_dtype, "League": pl.Utf8, "Match Id": pl.Utf8},
+        orient="row",
+    )
+    return normalize_fixtures(df, sport)
+
+
+def test_reconcile_matches_on_sport_league_and_date():
+    programs = _programs(
+        [
+            ["Ice Hockey", "Sweden", "SHL Playoffs", "3/4/2025"],
+            ["Ice Hockey", "Finland", "Liiga", "3/5/2025"],
+            ["Ice Hockey", "Germany", "DEL", None],
+        ]
+    )
+    fixtures = _fixtures(
+        [
+            ["03/04/2025", "Sweden.SHL", "1"],
+            ["03/04/2025", "Finland.Liiga", "2"],
+            ["03/09/2025", "Germany.DEL", "3"],
+        ]
+    )
+
+    unmatched_programs, unmatched_fixtures, unreadable = reconcile(programs, fixtures)
+
+    assert unmatched_programs["Tournament"].to_list() == ["Liiga"]
+    assert unmatched_fixtures["Match Id"].to_list() == ["2"]
+    assert unreadable.is_empty()
+
+
+def test_reconcile_reports_unreadable_dates_separately():
+    programs = _programs(
+        [
+            ["Ice Hockey", "Sweden", "SHL", "2/31/2025"],
+            ["Ice Hockey", "Sweden", "SHL", "not a date"],
+        ]
+    )
+    fixtures = _fixtures([["03/04/2025", "Sweden.SHL", "1"]])
+
+    unmatched_programs, unmatched_fixtures, unreadable = reconcile(programs, fixtures)
+
+    # Not treated as undated programs, which would match any SHL fixture
+    assert unmatched_programs.is_empty()
+    assert unmatched_fixtures["Match Id"].to_list() == ["1"]
+    assert unreadable["Date"].to_list() == ["2/31/2025", "not a date"]
+
+
+def test_fixture_dates_may_be_typed_or_iso():
+    typed = _fixtures([[date(2025, 3, 4), "Sweden.SHL", "1"]], date_dtype=pl.Date)
+    iso = _fixtures([["2025-03-04", "Sweden.SHL", "2"]])
+    programs = _programs([["Ice Hockey", "Sweden", "SHL", "3/4/2025"]])
+
+    unmatched_programs, unmatched_fixtures, unreadable = reconcile(
+        programs, pl.concat([typed, iso])
+    )
+
+    assert typed["Date key"].to_list() == [date(2025, 3, 4)]
+    assert unmatched_programs.is_empty()
+    assert unmatched_fixtures.is_empty()
+    assert unreadable.is_empty()
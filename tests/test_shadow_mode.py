@@ -0,0 +1,84 @@
+import polars as pl
+
+from load_test import synthetic_export
+from shadow_mode import ShadowReport, diff_frames, run_corpus, run_shadow
+
+
+def _frame(ids, goals=None):
+    goals = goals if goals is not None else list(range(len(ids)))
+    return pl.DataFrame(
+        {"Match Id": ids, "Goals": goals}, schema={"Match Id": pl.Utf8, "Goals": pl.Int64}
+    )
+
+
+def _diff(reference, candidate):
+    return diff_frames(reference, candidate, ShadowReport(page="Soccer", reference_seconds=0.0))
+
+
+def test_identical_frames_are_equivalent_with_null_and_duplicate_keys():
+    df = _frame(["1", None, "3", "3"])
+
+    report = _diff(df, df.clone())
+
+    assert report.equivalent
+    assert report.missing_keys == [] and report.extra_keys == []
+
+
+def test_missing_and_extra_keys():
+    report = _diff(_frame(["1", "2", "2"]), _frame(["1", "2", "4"]))
+
+    assert report.missing_keys == ["2"]
+    assert report.extra_keys == ["4"]
+    assert not report.equivalent
+    assert "1 rows missing, 1 extra" in report.summary()
+
+
+def test_cell_mismatches_and_dtypes():
+    reference = _frame(["1", "2", "3"], [1, None, 3])
+    candidate = _frame(["1", "2", "3"], [1, 2, 3])
+
+    assert _diff(reference, candidate).cell_mismatches == {"Goals": ["2"]}
+
+    report = _diff(reference, candidate.with_columns(pl.col("Goals").cast(pl.Int32)))
+    assert report.dtype_mismatches == {"Goals": ("Int64", "Int32")}
+    assert report.cell_mismatches == {}
+
+
+def test_row_order_and_columns():
+    reference = _frame(["1", "2"])
+
+    reordered = _diff(reference, reference.reverse())
+    assert not reordered.order_matches and not reordered.equivalent
+
+    report = _diff(reference, reference.with_columns(pl.lit(1).alias("Extra")))
+    assert report.extra_columns == ["Extra"] and not report.equivalent
+
+
+def test_unkeyed_sides_are_reported():
+    report = _diff(_frame(["1"]).drop("Match Id"), _frame(["1"]))
+
+    assert report.unkeyed == ["reference"]
+    assert not report.equivalent
+    assert report.missing_keys == [] and report.extra_keys == []
+
+
+def test_run_shadow_compares_candidate_with_reference():
+    df = pl.read_excel(synthetic_export("Soccer", 50))
+
+    assert run_shadow("Soccer", df).equivalent
+
+    failed = run_shadow("Soccer", df, candidate=lambda df: 1 / 0)
+    assert failed.candidate_error == "division by zero" and not failed.equivalent
+
+    report = run_shadow("Soccer", df, candidate=lambda df: df.head(0))
+    assert not report.equivalent
+
+
+def test_run_corpus_keeps_going_past_bad_exports(tmp_path):
+    (tmp_path / "a_broken.xlsx").write_bytes(b"not a workbook")
+    (tmp_path / "b_good.xlsx").write_bytes(synthetic_export("Soccer", 50))
+
+    reports = run_corpus(str(tmp_path), "Soccer")
+
+    assert [report.equivalent for report in reports] == [False, True]
+    assert reports[0].reference_error
@@ -0,0 +1,75 @@
+import json
+
+import polars as pl
+import pytest
+
+import upload_flow
+from conftest import rewrite
+from league_rules import RULE_FILES
+from load_test import synthetic_export
+from match_history import MatchHistory
+from memory_manager import SessionFrames
+from upload_flow import UploadError, finish_upload, process_upload
+
+
+def test_process_upload_reuses_session_frames(tmp_path):
+    data = synthetic_export("Soccer", 50)
+    frames = SessionFrames(1 << 30, str(tmp_path))
+    first = process_upload("Soccer", "export.xlsx", data, frames=frames)
+    again = process_upload("Soccer", "export.xlsx", data, frames=frames)
+
+    assert first.fresh and not again.fresh
+    assert again.df_display.equals(first.df_display)
+    frames.close()
+
+
+def test_ice_hockey_uploads_are_checked_against_history(tmp_path):
+    history = MatchHistory(str(tmp_path))
+    first = process_upload("Ice Hockey", "a.xlsx", synthetic_export("Ice Hockey", 50), history=history)
+    assert finish_upload(first, history=history) == []
+
+    second = process_upload(
+        "Ice Hockey", "b.xlsx", synthetic_export("Ice Hockey", 50, seed=1), history=history
+    )
+
+    assert first.df_display["Goals issue"].null_count() == first.df_display.height
+    assert second.df_display["Goals issue"].drop_nulls().len() > 0
+    assert second.reference["Goals issue"].null_count() == second.reference.height
+
+
+def test_unreadable_xls_raises_upload_error():
+    with pytest.raises(UploadError):
+        process_upload("Soccer", "export.xls", b"not a workbook")
+
+
+def test_cached_uploads_reuse_the_excel_download(tmp_path, monkeypatch):
+    data = synthetic_export("Soccer", 50)
+    frames = SessionFrames(1 << 30, str(tmp_path))
+    first = process_upload("Soccer", "export.xlsx", data, frames=frames)
+
+    def no_write(df):
+        raise AssertionError("download written again")
+
+    monkeypatch.setattr(upload_flow, "to_excel", no_write)
+    again = process_upload("Soccer", "export.xlsx", data, frames=frames)
+
+    assert again.excel == first.excel
+    assert pl.read_excel(again.excel).equals(first.df_display)
+    frames.close()
+
+
+def test_rules_edits_reprocess_cached_uploads(tmp_path, rules_dir):
+    data = synthetic_export("Soccer", 50)
+    frames = SessionFrames(1 << 30, str(tmp_path))
+    first = process_upload("Soccer", "export.xlsx", data, key="Soccer:file", frames=frames)
+
+    path = rules_dir / RULE_FILES["Soccer"]
+    spec = json.loads(path.read_text())
+    spec["include"] = ["Italy.Serie A"]
+    rewrite(path, json.dumps(spec))
+    edited = process_upload("Soccer", "export.xlsx", data, key="Soccer:file", frames=frames)
+
+    assert edited.fresh
+    assert edited.df_display["League"].unique().to_list() == ["Italy.Serie A "]
+    assert edited.df_display.height < first.df_display.height
+    frames.close()
@@ -0,0 +1,181 @@
+"""What a sport page does with an uploaded export, without any Streamlit code.
+
+The app and ``load_test.py`` both run uploads through here: the app passes
+callbacks for what it shows while a file is processed, the load test passes
+none. An upload is read once, processed, checked against the goals history
+(Ice Hockey) and written to an Excel download; the frame and the download
+are stored in the session's ``SessionFrames`` under a key that includes the
+version of the page's league rules, so a rules edit reprocesses the upload.
+``finish_upload`` then records it in the history and runs the sampled
+shadow check, once the page has been rendered.
+"""
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Callable, Optional
+
+import polars as pl
+
+from league_rules import load_rules, rules_error
+from match_history import MatchHistory
+from memory_manager import SessionFrames
+from shadow_mode import maybe_shadow
+from sport_pipelines import PIPELINES, xls_to_xlsx
+
+# Page whose uploads are checked against and recorded in the goals history
+HISTORY_PAGE = "Ice Hockey"
+
+
+class UploadError(ValueError):
+    """Raised when an uploaded .xls file cannot be converted."""
+
+
+@dataclass
+class UploadResult:
+    """Processed upload, plus what ``finish_upload`` needs for a fresh one.
+
+    ``excel`` holds the bytes of the Excel download. ``df`` and ``reference``
+    (the raw frame and the pipeline output before the goals history check)
+    are None when the result was reused from the session's frames.
+    """
+
+    page: str
+    df_display: pl.DataFrame
+    export_id: str
+    excel: bytes
+    df: Optional[pl.DataFrame] = None
+    reference: Optional[pl.DataFrame] = None
+    elapsed: float = 0.0
+    warnings: list = field(default_factory=list)
+
+    @property
+    def fresh(self) -> bool:
+        return self.df is not None
+
+
+def upload_id(data: bytes) -> str:
+    """Id of an export's contents, the same for every upload of the same file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_upload(name: str, data: bytes) -> pl.DataFrame:
+    """Read an uploaded workbook, converting .xls files first.
+
+    Raises:
+        UploadError: If an .xls file cannot be converted
+    """
+    if not name.endswith(".xls"):
+        return pl.read_excel(data)
+    try:
+        converted_file_path = xls_to_xlsx(data)
+    except Exception as e:
+        raise UploadError(f"Error converting .xls file: {str(e)}") from e
+    try:
+        return pl.read_excel(converted_file_path)
+    finally:
+        # Clean up the temporary converted file
+        try:
+            os.unlink(converted_file_path)
+        except OSError:
+            pass
+
+
+def process_upload(
+    page: str,
+    name: str,
+    data: bytes,
+    key: Optional[str] = None,
+    frames: Optional[SessionFrames] = None,
+    history: Optional[MatchHistory] = None,
+    on_convert: Optional[Callable[[], None]] = None,
+) -> UploadResult:
+    """Process an uploaded export for ``page``, reusing the session's earlier result.
+
+    Args:
+        page: Sidebar page name
+        name: File name of the upload
+        data: Contents of the upload
+        key: Key of the result in ``frames``, to which the rules digest is
+            added; defaults to the page and contents
+        frames: Session store of processed frames, if any
+        history: Goals history for Ice Hockey; the default store if not given
+        on_convert: Called before an .xls file is converted
+
+    Returns:
+        UploadResult for the upload
+
+    Raises:
+        UploadError: If an .xls file cannot be converted
+    """
+    export_id = upload_id(data)
+    # Results processed under older rules are not reused; they age out of frames
+    key = f"{key or f'{page}:{export_id}'}:{load_rules(page).digest}"
+    excel_key = f"{key}:excel"
+    if frames is not None:
+        df_display = frames.get(key)
+        if df_display is not None:
+            excel = frames.get(excel_key)
+            if excel is None:
+                excel = to_excel(df_display)
+                frames.put(excel_key, excel)
+            return UploadResult(page, df_display, export_id, excel)
+
+    if on_convert is not None and name.endswith(".xls"):
+        on_convert()
+    df = read_upload(name, data)
+
+    start = time.perf_counter()
+    reference = PIPELINES[page](df)
+    elapsed = time.perf_counter() - start
+    result = UploadResult(
+        page, reference, export_id, b"", df=df, reference=reference, elapsed=elapsed
+    )
+    if rules_error(page):
+        result.warnings.append(
+            f"League rules file was rejected, using the last valid version: {rules_error(page)}"
+        )
+
+    if page == HISTORY_PAGE:
+        try:
+            result.df_display = (history or MatchHistory()).fill_goals_issue(
+                reference, export_id
+            )
+        except Exception as e:
+            result.warnings.append(
+                f"Could not check goals against earlier exports: {str(e)}"
+            )
+
+    result.excel = to_excel(result.df_display)
+    if frames is not None:
+        frames.put(key, result.df_display)
+        frames.put(excel_key, result.excel)
+    return result
+
+
+def to_excel(df: pl.DataFrame) -> bytes:
+    """Write the displayed columns of a processed frame to an Excel download."""
+    output = BytesIO()
+    df.write_excel(output)
+    return output.getvalue()
+
+
+def finish_upload(result: UploadResult, history: Optional[MatchHistory] = None) -> list:
+    """Record a fresh upload in the goals history and run the sampled shadow check.
+
+    Meant to run once the result is shown, so the user does not wait on it.
+
+    Returns:
+        Warnings to show, if any
+    """
+    warnings = []
+    if not result.fresh:
+        return warnings
+    if result.page == HISTORY_PAGE:
+        try:
+            (history or MatchHistory()).record(result.df_display, result.export_id)
+        except Exception as e:
+            warnings.append(f"Could not save this export to the goals history: {str(e)}")
+    maybe_shadow(result.page, result.df, result.reference, result.elapsed)
+    return warnings